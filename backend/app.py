@@ -1,21 +1,74 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 import logging
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import statistics
-import time
+import asyncio
 import random
-import json
 import os
-from typing import Dict, Any, Optional
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, List, Optional
+
+from cache_store import ColumnarStore, SqliteStore, compact_chain, widen
+from data_sources import SnapshotNotFound, create_provider
+from fast_json import (
+    LAYOUTS,
+    FastJSONResponse,
+    dumps,
+    dumps_with,
+    encode_records,
+    encoded_response,
+    to_layout
+)
+from market_calendar import MarketHoursTTL, is_market_open, next_open, next_close
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, Registry
+from rate_limiter import (
+    TokenBucketLimiter,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_RETRY,
+    PRIORITY_BACKGROUND,
+    PRIORITY_NAMES,
+    SHARED_STATE_SUPPORTED
+)
+from price_history import REALIZED_VOL_WINDOWS, PriceHistoryStore
+from scoring_engine import LEGS, options_hist_vol, score_many
+from snapshot_store import SnapshotStore, chain_delta, split_sides
+from strike_index import strike_index
+from unusual_options import MONEYNESS, OPTION_RECORD_FIELDS, OPTION_TYPES, UnusualOptions
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Options Unusualness API")
+# Responses render with orjson when it is installed (see fast_json)
+app = FastAPI(title="Options Unusualness API", default_response_class=FastJSONResponse)
+
+# Prometheus metrics, served at /metrics. Stats the app already keeps (cache
+# hits, limiter queues, coalescing) are exported by a collector at scrape time.
+metrics_registry = Registry()
+REQUEST_LATENCY = metrics_registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'route', 'status'])
+LIMITER_WAIT = metrics_registry.histogram(
+    'upstream_limiter_wait_seconds', 'Time spent waiting for an upstream rate-limiter token', ['lane'])
+UPSTREAM_LATENCY = metrics_registry.histogram(
+    'upstream_request_duration_seconds', 'Latency of each upstream data provider call', ['call', 'outcome'])
+UPSTREAM_ERRORS = metrics_registry.counter(
+    'upstream_errors_total', 'Failed upstream data provider calls', ['call'])
+UPSTREAM_RETRIES = metrics_registry.counter(
+    'upstream_retries_total', 'Upstream calls retried after a failure', ['call'])
+SCORING_LATENCY = metrics_registry.histogram(
+    'scoring_duration_seconds', 'Time spent scoring chains and summarizing unusual activity', ['stage'])
+CACHE_SERIALIZATION = metrics_registry.histogram(
+    'cache_serialization_seconds', 'Time to persist or load one cache entry', ['namespace', 'operation'])
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,263 +77,973 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_LATENCY)
 
-# Enhanced cache with TTL and file-based persistence
+# Enhanced cache with TTL, bounded LRU memory and per-entry columnar persistence
 class EnhancedCache:
-    def __init__(self, cache_dir="./cache"):
+    NAMESPACES = ('ticker_data', 'options_data', 'unusualness_scores', 'expiry_chains', 'price_history')
+    # Disk-only namespace holding the unpruned chains behind compact options entries
+    FULL_CHAINS = 'options_full'
+    
+    def __init__(self, cache_dir="./cache", flush_interval=5.0, flush_max_dirty=50,
+                 sweep_interval=60.0, max_entries=None, max_bytes=None, stale_grace=None,
+                 ttl_policies=None, backend='local', sqlite_path=None,
+                 compact_chains=True, keep_full_chains=False, store_workers=4):
         self.cache_dir = cache_dir
+        # Options entries keep only the chain columns scoring reads (see
+        # compact_chain); keep_full_chains also persists the chains as fetched
+        # for get_full_options_data
+        self.compact_chains = compact_chains
+        self.keep_full_chains = compact_chains and keep_full_chains
+        # Namespaces are kept in LRU order: least recently used first
         self.memory_cache = {
-            'ticker_data': {},
-            'options_data': {},
-            'unusualness_scores': {},
+            'ticker_data': OrderedDict(),
+            'options_data': OrderedDict(),
+            'unusualness_scores': OrderedDict(),
+            'expiry_chains': OrderedDict(),
+            'price_history': OrderedDict(),
             'last_updated': None,
-            'analysis_running': False
+            'analysis_running': False,
+            'market_snapshot': None
         }
         self.ttl = {
             'ticker_data': 3600,  # 1 hour
             'options_data': 3600 * 4,  # 4 hours
-            'unusualness_scores': 3600 * 12  # 12 hours
+            'unusualness_scores': 3600 * 12,  # 12 hours
+            'expiry_chains': 3600 * 4,  # 4 hours
+            # PriceHistoryStore tracks which sessions an entry is missing itself; the
+            # TTL only decides when an untouched series is dropped
+            'price_history': 3600 * 24  # 1 day
+        }
+        # Namespaces with a policy (e.g. MarketHoursTTL) take their expiry from it;
+        # the rest use the fixed TTLs above
+        self.ttl_policies = dict(ttl_policies or {})
+        # Expired entries stay servable (marked stale) for this long past their TTL
+        # while a background refresh replaces them
+        self.stale_grace = {
+            'ticker_data': 3600,
+            'options_data': 3600 * 4,
+            'unusualness_scores': 3600 * 12,
+            'expiry_chains': 3600 * 4,
+            'price_history': 3600 * 24 * 6,
+            **(stale_grace or {})
+        }
+        
+        # Memory budgets; evicted entries stay on disk and reload on next access
+        self.max_entries = {
+            'ticker_data': 5000,
+            'options_data': 200,
+            'unusualness_scores': 5000,
+            'expiry_chains': 1000,
+            'price_history': 5000,
+            **(max_entries or {})
+        }
+        self.max_bytes = {
+            'ticker_data': None,
+            'options_data': 512 * 1024 * 1024,
+            'unusualness_scores': None,
+            'expiry_chains': 256 * 1024 * 1024,
+            'price_history': 64 * 1024 * 1024,
+            **(max_bytes or {})
         }
+        self.entry_bytes = {namespace: {} for namespace in self.NAMESPACES}
+        # Results computed from an options_data entry (unusual-options list, volume
+        # totals), memoized against that entry's version
+        self.derived = {}
+        self.stats = {namespace: {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+                      for namespace in self.NAMESPACES}
+        # Recent hits per ticker, used to pick popular entries to refresh ahead of expiry
+        self.access_counts = {namespace: {} for namespace in self.NAMESPACES}
         
         # Create cache directory if it doesn't exist
         os.makedirs(cache_dir, exist_ok=True)
         
-        # Load cache from disk if available
+        # Each entry is persisted on its own; only changed entries are rewritten.
+        # The local backend keeps per-entry files owned by this process. The sqlite
+        # backend is one database shared by every worker on the host: writes are
+        # flushed as soon as they are made and reads check that the memory copy is
+        # still current. Every shared-store call runs on store_executor, so a busy
+        # database never blocks the event loop.
+        if backend == 'sqlite':
+            self.store = SqliteStore(sqlite_path or os.path.join(cache_dir, "cache.sqlite3"))
+        elif backend == 'local':
+            self.store = ColumnarStore(os.path.join(cache_dir, "entries"))
+        else:
+            raise ValueError(f"Unknown cache backend {backend!r}; expected local or sqlite")
+        self.backend = backend
+        self.shared = backend == 'sqlite'
+        # Lease owner id for coordinating fetches and scans with other workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Shared-store version (updated timestamp) of each entry held in memory
+        self.entry_updated = {namespace: {} for namespace in self.NAMESPACES}
+        self.snapshot_updated = None
+        self.disk_keys = {namespace: set() for namespace in self.NAMESPACES + (self.FULL_CHAINS,)}
+        # (namespace, ticker) -> entry changed since the last save. Holding the entry
+        # itself means an LRU eviction before the flush can't lose the write.
+        self.dirty = {}
+        self.dirty_lock = threading.Lock()
+        # Held for a whole save, so flush() returns only once a save the flusher
+        # already started has landed too
+        self.save_lock = threading.Lock()
+        self.store_executor = ThreadPoolExecutor(max_workers=store_workers, thread_name_prefix="cache-store")
+        
+        # Write-behind flusher: changed entries are persisted off the request path,
+        # every flush_interval seconds or as soon as flush_max_dirty entries pile up
+        self.flush_interval = flush_interval
+        self.flush_max_dirty = flush_max_dirty
+        self._flush_wakeup = threading.Event()
+        self._flush_stop = threading.Event()
+        self._flusher = None
+        self.sweep_interval = sweep_interval
+        
+        # Index the cache on disk; entries are loaded lazily on first access
         self._load_cache()
     
     def _load_cache(self):
         try:
-            cache_file = os.path.join(self.cache_dir, "cache.json")
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
-                    disk_cache = json.load(f)
-                    
-                # Only use cache entries that haven't expired
-                now = datetime.now()
-                
-                # Load ticker data
-                if 'ticker_data' in disk_cache:
-                    for ticker, data in disk_cache.get('ticker_data', {}).items():
-                        if 'timestamp' in data:
-                            cache_time = datetime.fromisoformat(data['timestamp'])
-                            if (now - cache_time).total_seconds() < self.ttl['ticker_data']:
-                                self.memory_cache['ticker_data'][ticker] = data
-                
-                # Load options data
-                if 'options_data' in disk_cache:
-                    for ticker, data in disk_cache.get('options_data', {}).items():
-                        if 'timestamp' in data:
-                            cache_time = datetime.fromisoformat(data['timestamp'])
-                            if (now - cache_time).total_seconds() < self.ttl['options_data']:
-                                # Convert JSON lists back to DataFrame for options chains
-                                for key in ['calls_near', 'puts_near', 'calls_target', 'puts_target']:
-                                    if key in data and isinstance(data[key], list):
-                                        data[key] = pd.DataFrame(data[key])
-                                
-                                if 'historical_data' in data and isinstance(data['historical_data'], dict):
-                                    data['historical_data'] = pd.DataFrame(data['historical_data'])
-                                
-                                self.memory_cache['options_data'][ticker] = data
-                
-                # Load unusualness scores
-                if 'unusualness_scores' in disk_cache:
-                    for ticker, data in disk_cache.get('unusualness_scores', {}).items():
-                        if 'timestamp' in data:
-                            cache_time = datetime.fromisoformat(data['timestamp'])
-                            if (now - cache_time).total_seconds() < self.ttl['unusualness_scores']:
-                                self.memory_cache['unusualness_scores'][ticker] = data
-                
-                logger.info(f"Loaded cache with {len(self.memory_cache['ticker_data'])} tickers, "
-                          f"{len(self.memory_cache['options_data'])} options datasets, "
-                          f"{len(self.memory_cache['unusualness_scores'])} unusualness scores")
+            for namespace in self.NAMESPACES + (self.FULL_CHAINS,):
+                self.disk_keys[namespace] = self.store.keys(namespace)
+            
+            logger.info(f"Found cache on disk with {len(self.disk_keys['ticker_data'])} tickers, "
+                      f"{len(self.disk_keys['options_data'])} options datasets, "
+                      f"{len(self.disk_keys['unusualness_scores'])} unusualness scores")
         except Exception as e:
             logger.error(f"Error loading cache: {str(e)}")
     
     def _save_cache(self):
+        with self.save_lock:
+            with self.dirty_lock:
+                dirty = dict(self.dirty)
+            saved = 0
+            for key, data in dirty.items():
+                namespace, ticker = key
+                try:
+                    with CACHE_SERIALIZATION.time(namespace, 'save'):
+                        updated = self.store.save(namespace, ticker, data)
+                    self.disk_keys[namespace].add(ticker)
+                    if self.shared and namespace in self.entry_updated and \
+                            self.memory_cache[namespace].get(ticker) is data:
+                        self.entry_updated[namespace][ticker] = updated
+                    saved += 1
+                except Exception as e:
+                    logger.error(f"Error saving {namespace} for {ticker}: {str(e)}")
+                finally:
+                    # Entries stay dirty until written, so shared reads keep serving the
+                    # memory copy meanwhile; one rewritten since stays queued
+                    with self.dirty_lock:
+                        if self.dirty.get(key) is data:
+                            del self.dirty[key]
+        
+        logger.info(f"Saved {saved} cache entries to disk")
+    
+    async def run_store(self, func, *args):
+        """Run a blocking store call on the store executor instead of the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.store_executor, partial(func, *args))
+    
+    async def flush(self):
+        """Persist pending writes now instead of waiting for the flusher"""
+        if self.dirty:
+            await self.run_store(self._save_cache)
+    
+    def _prune_disk(self):
+        """Delete persisted entries past their TTL and stale grace without being touched"""
+        for namespace in self.NAMESPACES:
+            for ticker in self.store.prune(namespace, self._max_lifetime(namespace) + self.stale_grace[namespace]):
+                self.disk_keys[namespace].discard(ticker)
+            if self.shared:
+                # Other workers add entries too
+                self.disk_keys[namespace] = self.store.keys(namespace)
+        # Full chains live as long as the options entries they back
+        lifetime = self._max_lifetime('options_data') + self.stale_grace['options_data']
+        for ticker in self.store.prune(self.FULL_CHAINS, lifetime):
+            self.disk_keys[self.FULL_CHAINS].discard(ticker)
+    
+    def _timestamp(self, data: Dict[str, Any]) -> datetime:
+        return data['timestamp'] if isinstance(data['timestamp'], datetime) else datetime.fromisoformat(data['timestamp'])
+    
+    def _expires_at(self, namespace: str, data: Dict[str, Any]) -> datetime:
+        timestamp = self._timestamp(data)
+        policy = self.ttl_policies.get(namespace)
+        if policy is not None:
+            return policy.expires_at(timestamp)
+        return timestamp + timedelta(seconds=self.ttl[namespace])
+    
+    def _max_lifetime(self, namespace: str) -> float:
+        policy = self.ttl_policies.get(namespace)
+        return policy.max_lifetime if policy is not None else self.ttl[namespace]
+    
+    def _is_fresh(self, namespace: str, data: Dict[str, Any]) -> bool:
+        return datetime.now() < self._expires_at(namespace, data)
+    
+    def _is_servable(self, namespace: str, data: Dict[str, Any]) -> bool:
+        grace = timedelta(seconds=self.stale_grace[namespace])
+        return datetime.now() < self._expires_at(namespace, data) + grace
+    
+    def is_stale(self, namespace: str, data: Dict[str, Any]) -> bool:
+        return not self._is_fresh(namespace, data)
+    
+    def _entry_size(self, data: Dict[str, Any]) -> int:
+        size = 512  # rough allowance for the dict and scalar fields
+        for value in data.values():
+            if isinstance(value, pd.DataFrame):
+                size += int(value.memory_usage(index=True, deep=True).sum())
+        return size
+    
+    def _remember(self, namespace: str, ticker: str, data: Dict[str, Any]):
+        """Put an entry in memory as most recently used, evicting LRU entries over budget"""
+        entries = self.memory_cache[namespace]
+        sizes = self.entry_bytes[namespace]
+        entries[ticker] = data
+        entries.move_to_end(ticker)
+        sizes[ticker] = self._entry_size(data)
+        
+        max_entries = self.max_entries[namespace]
+        max_bytes = self.max_bytes[namespace]
+        while len(entries) > 1 and (
+                (max_entries is not None and len(entries) > max_entries) or
+                (max_bytes is not None and sum(sizes.values()) > max_bytes)):
+            evicted, _ = entries.popitem(last=False)
+            sizes.pop(evicted, None)
+            self.entry_updated[namespace].pop(evicted, None)
+            if namespace == 'options_data':
+                self.derived.pop(evicted, None)
+            self.stats[namespace]['evictions'] += 1
+    
+    def _forget(self, namespace: str, ticker: str):
+        self.memory_cache[namespace].pop(ticker, None)
+        self.entry_bytes[namespace].pop(ticker, None)
+        self.entry_updated[namespace].pop(ticker, None)
+        if namespace == 'options_data':
+            self.derived.pop(ticker, None)
+    
+    def _pending(self, namespace: str, ticker: str) -> Optional[Dict[str, Any]]:
+        """An entry still waiting for the flusher, put back in memory.
+
+        An entry evicted before its flush is newer than the stored copy, so
+        it must win over a disk read.
+        """
+        with self.dirty_lock:
+            entry = self.dirty.get((namespace, ticker))
+        if entry is not None:
+            self._remember(namespace, ticker, entry)
+        return entry
+    
+    async def _load_entry(self, namespace: str, ticker: str) -> Optional[Dict[str, Any]]:
+        def load():
+            with CACHE_SERIALIZATION.time(namespace, 'load'):
+                return self.store.load(namespace, ticker)
+        
+        def drop():
+            # Under save_lock, so a flush of a newer entry can't land between the check and the delete
+            with self.save_lock:
+                if (namespace, ticker) not in self.dirty and ticker not in self.memory_cache[namespace]:
+                    self.store.delete(namespace, ticker)
+        
         try:
-            # Convert datetime objects to ISO format for JSON serialization
-            export_cache = {
-                'ticker_data': {},
-                'options_data': {},
-                'unusualness_scores': {}
-            }
-            
-            # Prepare ticker data for export
-            for ticker, data in self.memory_cache['ticker_data'].items():
-                export_cache['ticker_data'][ticker] = {
-                    'price': data['price'],
-                    'timestamp': data['timestamp'].isoformat() if isinstance(data['timestamp'], datetime) else data['timestamp']
-                }
-            
-            # Prepare options data for export
-            for ticker, data in self.memory_cache['options_data'].items():
-                # Convert DataFrame to dict for serialization
-                serializable_data = {k: v for k, v in data.items() if k != 'timestamp'}
-                
-                for key in ['calls_near', 'puts_near', 'calls_target', 'puts_target']:
-                    if key in serializable_data and isinstance(serializable_data[key], pd.DataFrame):
-                        serializable_data[key] = serializable_data[key].to_dict(orient='records')
-                
-                if 'historical_data' in serializable_data and isinstance(serializable_data['historical_data'], pd.DataFrame):
-                    serializable_data['historical_data'] = {
-                        'Close': serializable_data['historical_data']['Close'].tolist() 
-                        if 'Close' in serializable_data['historical_data'] else []
-                    }
-                
-                export_cache['options_data'][ticker] = {
-                    **serializable_data,
-                    'timestamp': data['timestamp'].isoformat() if isinstance(data['timestamp'], datetime) else data['timestamp']
-                }
-            
-            # Prepare unusualness scores for export
-            for ticker, data in self.memory_cache['unusualness_scores'].items():
-                export_cache['unusualness_scores'][ticker] = {
-                    **{k: v for k, v in data.items() if k != 'timestamp'},
-                    'timestamp': data['timestamp'].isoformat() if isinstance(data['timestamp'], datetime) else data['timestamp']
-                }
-            
-            # Save to disk
-            cache_file = os.path.join(self.cache_dir, "cache.json")
-            with open(cache_file, 'w') as f:
-                json.dump(export_cache, f)
-                
-            logger.info("Cache saved to disk")
+            data = await self.run_store(load)
         except Exception as e:
-            logger.error(f"Error saving cache: {str(e)}")
+            logger.error(f"Error loading {namespace} for {ticker} from disk: {str(e)}")
+            data = None
+        
+        # Set, or loaded by another request, while the disk was read
+        current = self.memory_cache[namespace].get(ticker)
+        if current is not None:
+            return current
+        pending = self._pending(namespace, ticker)
+        if pending is not None:
+            return pending
+        
+        if data is None or not self._is_servable(namespace, data):
+            # Expired or unreadable entries are dropped from disk on first touch
+            try:
+                await self.run_store(drop)
+            except Exception as e:
+                logger.error(f"Error deleting {namespace} for {ticker} from disk: {str(e)}")
+            self.disk_keys[namespace].discard(ticker)
+            return None
+        
+        self._remember(namespace, ticker, data)
+        return data
     
-    def get_ticker_data(self, ticker: str) -> Optional[Dict[str, Any]]:
+    async def _load_shared(self, namespace: str, ticker: str, data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Bring an entry in line with the shared store, which other workers write to"""
+        if (namespace, ticker) in self.dirty:
+            return data  # written here and not flushed yet, so newer than the store
+        known = self.entry_updated[namespace].get(ticker) if data is not None else None
+        
+        def load():
+            with CACHE_SERIALIZATION.time(namespace, 'load'):
+                return self.store.load_if_changed(namespace, ticker, known)
+        
+        try:
+            updated, entry = await self.run_store(load)
+        except Exception as e:
+            logger.error(f"Error loading {namespace} for {ticker} from the shared cache: {str(e)}")
+            return data
+        
+        if (namespace, ticker) in self.dirty:
+            # Set here while the store was being read
+            return self.memory_cache[namespace].get(ticker)
+        if updated is None:
+            # Cleared or pruned by another worker
+            if data is not None:
+                self._forget(namespace, ticker)
+            self.disk_keys[namespace].discard(ticker)
+            return None
+        if entry is None:
+            return data  # memory copy is current
+        
+        self.disk_keys[namespace].add(ticker)
+        if not self._is_servable(namespace, entry):
+            self._forget(namespace, ticker)
+            return None
+        self._remember(namespace, ticker, entry)
+        self.entry_updated[namespace][ticker] = updated
+        return entry
+    
+    async def _get(self, namespace: str, ticker: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
         ticker = ticker.upper()
-        if ticker in self.memory_cache['ticker_data']:
-            data = self.memory_cache['ticker_data'][ticker]
-            now = datetime.now()
-            timestamp = data['timestamp'] if isinstance(data['timestamp'], datetime) else datetime.fromisoformat(data['timestamp'])
-            if (now - timestamp).total_seconds() < self.ttl['ticker_data']:
+        data = self.memory_cache[namespace].get(ticker)
+        if data is None:
+            data = self._pending(namespace, ticker)
+        if self.shared:
+            data = await self._load_shared(namespace, ticker, data)
+        elif data is None and ticker in self.disk_keys[namespace]:
+            data = await self._load_entry(namespace, ticker)
+        if data is not None:
+            fresh = self._is_fresh(namespace, data)
+            if fresh or (allow_stale and self._is_servable(namespace, data)):
+                if ticker in self.memory_cache[namespace]:  # may be evicted during a store read
+                    self.memory_cache[namespace].move_to_end(ticker)
+                self.stats[namespace]['hits' if fresh else 'stale_hits'] += 1
+                counts = self.access_counts[namespace]
+                counts[ticker] = counts.get(ticker, 0) + 1
                 return data
+        self.stats[namespace]['misses'] += 1
         return None
     
-    def set_ticker_data(self, ticker: str, price: float):
+    def _set(self, namespace: str, ticker: str, data: Dict[str, Any],
+             timestamp: Optional[datetime] = None) -> Dict[str, Any]:
         ticker = ticker.upper()
-        self.memory_cache['ticker_data'][ticker] = {
-            'price': price,
-            'timestamp': datetime.now()
+        entry = {
+            **data,
+            'timestamp': timestamp or datetime.now()
         }
-        # Periodically save cache to disk
-        if random.random() < 0.1:  # 10% chance to save on each update
-            self._save_cache()
+        self._remember(namespace, ticker, entry)
+        # Mark the entry for the flusher instead of writing it inline
+        with self.dirty_lock:
+            self.dirty[(namespace, ticker)] = entry
+            pending = len(self.dirty)
+        # Other workers only see an entry once it is saved, so shared writes go out right away
+        if self.shared or pending >= self.flush_max_dirty:
+            self._flush_wakeup.set()
+        return entry
     
-    def get_options_data(self, ticker: str) -> Optional[Dict[str, Any]]:
-        ticker = ticker.upper()
-        if ticker in self.memory_cache['options_data']:
-            data = self.memory_cache['options_data'][ticker]
-            now = datetime.now()
-            timestamp = data['timestamp'] if isinstance(data['timestamp'], datetime) else datetime.fromisoformat(data['timestamp'])
-            if (now - timestamp).total_seconds() < self.ttl['options_data']:
-                return data
-        return None
+    def sweep_expired(self) -> int:
+        """Drop entries past their stale grace from memory instead of waiting for eviction"""
+        removed = 0
+        for namespace in self.NAMESPACES:
+            expired = [ticker for ticker, data in self.memory_cache[namespace].items()
+                       if not self._is_servable(namespace, data)]
+            for ticker in expired:
+                self._forget(namespace, ticker)
+            self.stats[namespace]['expired'] += len(expired)
+            removed += len(expired)
+        return removed
     
-    def set_options_data(self, ticker: str, data: Dict[str, Any]):
-        ticker = ticker.upper()
-        self.memory_cache['options_data'][ticker] = {
-            **data,
-            'timestamp': datetime.now()
+    def popular_expiring(self, namespace: str, min_hits: int, refresh_fraction: float):
+        """Tickers hit at least min_hits times recently whose entry is near the end of its TTL.
+
+        Access counts are halved on every call so popularity tracks recent traffic.
+        """
+        now = datetime.now()
+        counts = self.access_counts[namespace]
+        tickers = []
+        for ticker, data in self.memory_cache[namespace].items():
+            if counts.get(ticker, 0) < min_hits:
+                continue
+            timestamp = self._timestamp(data)
+            lifetime = self._expires_at(namespace, data) - timestamp
+            if now - timestamp >= lifetime * refresh_fraction:
+                tickers.append(ticker)
+        self.access_counts[namespace] = {t: c // 2 for t, c in counts.items() if c > 1}
+        return tickers
+    
+    def describe_ttls(self) -> Dict[str, Any]:
+        """Current TTL policy per namespace and the expiry it gives an entry written now"""
+        now = datetime.now()
+        described = {}
+        for namespace in self.NAMESPACES:
+            policy = self.ttl_policies.get(namespace)
+            expires_at = self._expires_at(namespace, {'timestamp': now})
+            described[namespace] = {
+                **(policy.describe() if policy is not None else {'type': 'fixed', 'ttl_seconds': self.ttl[namespace]}),
+                'stale_grace_seconds': self.stale_grace[namespace],
+                'effective_ttl_seconds': round((expires_at - now).total_seconds()),
+                'new_entries_expire_at': expires_at
+            }
+        return described
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            namespace: {
+                'entries': len(self.memory_cache[namespace]),
+                'bytes': sum(self.entry_bytes[namespace].values()),
+                'on_disk': len(self.disk_keys[namespace]),
+                'max_entries': self.max_entries[namespace],
+                'max_bytes': self.max_bytes[namespace],
+                **self.stats[namespace]
+            }
+            for namespace in self.NAMESPACES
         }
-        # Periodically save cache to disk
-        if random.random() < 0.2:  # 20% chance to save on each update
+    
+    def _flush_loop(self):
+        last_prune = time.monotonic()
+        while not self._flush_stop.is_set():
+            self._flush_wakeup.wait(self.flush_interval)
+            self._flush_wakeup.clear()
+            if self.dirty:
+                self._save_cache()
+            if time.monotonic() - last_prune >= self.sweep_interval:
+                last_prune = time.monotonic()
+                self._prune_disk()
+    
+    def start_flusher(self):
+        if self._flusher is not None:
+            return
+        self._flush_stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="cache-flusher", daemon=True)
+        self._flusher.start()
+    
+    def stop_flusher(self):
+        """Stop the background flusher and persist whatever is still dirty"""
+        if self._flusher is not None:
+            self._flush_stop.set()
+            self._flush_wakeup.set()
+            self._flusher.join()
+            self._flusher = None
+        if self.dirty:
             self._save_cache()
     
-    def get_unusualness_score(self, ticker: str) -> Optional[Dict[str, Any]]:
+    async def get_ticker_data(self, ticker: str) -> Optional[Dict[str, Any]]:
+        return await self._get('ticker_data', ticker)
+    
+    def set_ticker_data(self, ticker: str, price: float):
+        self._set('ticker_data', ticker, {'price': price})
+    
+    async def get_options_data(self, ticker: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        return await self._get('options_data', ticker, allow_stale)
+    
+    def set_options_data(self, ticker: str, data: Dict[str, Any]) -> Dict[str, Any]:
         ticker = ticker.upper()
-        if ticker in self.memory_cache['unusualness_scores']:
-            data = self.memory_cache['unusualness_scores'][ticker]
-            now = datetime.now()
-            timestamp = data['timestamp'] if isinstance(data['timestamp'], datetime) else datetime.fromisoformat(data['timestamp'])
-            if (now - timestamp).total_seconds() < self.ttl['unusualness_scores']:
-                return data
-        return None
+        # A new version invalidates everything derived from the previous chains
+        self.derived.pop(ticker, None)
+        version = uuid.uuid4().hex
+        if self.compact_chains:
+            chains = {leg: data[leg] for leg in LEGS if isinstance(data.get(leg), pd.DataFrame)}
+            if self.keep_full_chains:
+                self._save_full_chains(ticker, {**chains, 'version': version, 'timestamp': datetime.now()})
+            # Compact chains are sorted by strike, so scoring can skip sorting them
+            data = {**data, **{leg: compact_chain(chain) for leg, chain in chains.items()}, 'strikes_sorted': True}
+        return self._set('options_data', ticker, {**data, 'version': version})
     
-    def set_unusualness_score(self, ticker: str, data: Dict[str, Any]):
+    def _save_full_chains(self, ticker: str, entry: Dict[str, Any]):
+        # Written by the flusher like any other entry, but never held in memory
+        with self.dirty_lock:
+            self.dirty[(self.FULL_CHAINS, ticker)] = entry
+    
+    async def get_full_options_data(self, ticker: str, allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        """Options data with the chains as fetched, every yfinance column included.
+
+        Returns None when the ticker isn't cached or its full chains weren't
+        kept. Without compaction the cached entry already is full fidelity.
+        """
+        data = await self.get_options_data(ticker, allow_stale=allow_stale)
+        if data is None or not self.compact_chains:
+            return data
+        
         ticker = ticker.upper()
-        self.memory_cache['unusualness_scores'][ticker] = {
-            **data,
-            'timestamp': datetime.now()
-        }
-        # Periodically save cache to disk
-        if random.random() < 0.3:  # 30% chance to save on each update
-            self._save_cache()
+        with self.dirty_lock:
+            full = self.dirty.get((self.FULL_CHAINS, ticker))
+        if full is None and ticker in self.disk_keys[self.FULL_CHAINS]:
+            try:
+                full = await self.run_store(self.store.load, self.FULL_CHAINS, ticker)
+            except Exception as e:
+                logger.error(f"Error loading full chains for {ticker}: {str(e)}")
+        # Only chains fetched together with the cached entry belong to it
+        if full is None or full.get('version') != data.get('version'):
+            return None
+        return {**data, **{leg: full[leg] for leg in LEGS if leg in full}}
+    
+    def get_derived(self, ticker: str, version: Any) -> Optional[Dict[str, Any]]:
+        derived = self.derived.get(ticker.upper())
+        if derived is not None and version is not None and derived['version'] == version:
+            return derived['data']
+        return None
+    
+    def set_derived(self, ticker: str, version: Any, data: Dict[str, Any]):
+        if version is not None:
+            self.derived[ticker.upper()] = {'version': version, 'data': data}
+    
+    async def get_expiry_chain(self, ticker: str, expiry: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        return await self._get('expiry_chains', f"{ticker}:{expiry}", allow_stale)
+    
+    def set_expiry_chain(self, ticker: str, expiry: str, calls: pd.DataFrame, puts: pd.DataFrame) -> Dict[str, Any]:
+        """Cache one expiry of the term structure; each expiry expires on its own"""
+        if self.compact_chains:
+            calls, puts = compact_chain(calls), compact_chain(puts)
+        return self._set('expiry_chains', f"{ticker}:{expiry}",
+                         {'expiry': expiry, 'calls': calls, 'puts': puts, 'strikes_sorted': self.compact_chains})
+    
+    async def get_price_history(self, ticker: str, allow_stale: bool = True) -> Optional[Dict[str, Any]]:
+        return await self._get('price_history', ticker, allow_stale)
+    
+    def set_price_history(self, ticker: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return self._set('price_history', ticker, entry)
+    
+    async def get_unusualness_score(self, ticker: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        return await self._get('unusualness_scores', ticker, allow_stale)
+    
+    def set_unusualness_score(self, ticker: str, data: Dict[str, Any],
+                              options_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # A score is only as fresh as the chains it was computed from
+        timestamp = self._timestamp(options_data) if options_data else None
+        return self._set('unusualness_scores', ticker, data, timestamp)
+    
+    async def get_market_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Latest market scan, which with a shared cache may come from another worker"""
+        if self.shared:
+            try:
+                updated, snapshot = await self.run_store(self.store.load_if_changed, 'market_snapshot', 'latest',
+                                                         self.snapshot_updated)
+                if updated is None:
+                    self.memory_cache['market_snapshot'] = None
+                elif snapshot is not None:
+                    self.memory_cache['market_snapshot'] = snapshot
+                self.snapshot_updated = updated
+            except Exception as e:
+                logger.error(f"Error loading market snapshot from the shared cache: {str(e)}")
+        return self.memory_cache['market_snapshot']
+    
+    async def set_market_snapshot(self, snapshot: Dict[str, Any]):
+        self.memory_cache['market_snapshot'] = snapshot
+        if self.shared:
+            try:
+                self.snapshot_updated = await self.run_store(self.store.save, 'market_snapshot', 'latest', snapshot)
+            except Exception as e:
+                logger.error(f"Error saving market snapshot to the shared cache: {str(e)}")
+    
+    async def acquire_lease(self, name: str, ttl: float) -> bool:
+        """Claim work across workers; without a shared cache this process is the only worker"""
+        if not self.shared:
+            return True
+        try:
+            return await self.run_store(self.store.acquire_lease, name, self.worker_id, ttl)
+        except Exception as e:
+            logger.error(f"Error acquiring lease {name}: {str(e)}")
+            return True
+    
+    async def release_lease(self, name: str):
+        if self.shared:
+            try:
+                await self.run_store(self.store.release_lease, name, self.worker_id)
+            except Exception as e:
+                logger.error(f"Error releasing lease {name}: {str(e)}")
+    
+    async def lease_active(self, name: str) -> bool:
+        return self.shared and await self.run_store(self.store.lease_active, name)
     
     def clear(self):
-        self.memory_cache = {
-            'ticker_data': {},
-            'options_data': {},
-            'unusualness_scores': {},
-            'last_updated': datetime.now(),
-            'analysis_running': False
-        }
-        # Delete cache file
-        cache_file = os.path.join(self.cache_dir, "cache.json")
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
+        # Held throughout, so a flush already copying the dirty set can't write
+        # cleared entries back to disk after the store is wiped
+        with self.save_lock:
+            self.memory_cache = {
+                'ticker_data': OrderedDict(),
+                'options_data': OrderedDict(),
+                'unusualness_scores': OrderedDict(),
+                'expiry_chains': OrderedDict(),
+                'price_history': OrderedDict(),
+                'last_updated': datetime.now(),
+                'analysis_running': False,
+                'market_snapshot': None
+            }
+            self.entry_bytes = {namespace: {} for namespace in self.NAMESPACES}
+            self.derived = {}
+            self.access_counts = {namespace: {} for namespace in self.NAMESPACES}
+            self.disk_keys = {namespace: set() for namespace in self.NAMESPACES + (self.FULL_CHAINS,)}
+            self.entry_updated = {namespace: {} for namespace in self.NAMESPACES}
+            self.snapshot_updated = None
+            with self.dirty_lock:
+                self.dirty = {}
+            # Delete cached entries on disk, including a legacy monolithic cache.json
+            self.store.clear()
+            cache_file = os.path.join(self.cache_dir, "cache.json")
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
 
 # Initialize cache
-cache = EnhancedCache()
+CACHE_FLUSH_INTERVAL = float(os.environ.get("CACHE_FLUSH_INTERVAL", "5"))
+CACHE_FLUSH_MAX_DIRTY = int(os.environ.get("CACHE_FLUSH_MAX_DIRTY", "50"))
+CACHE_SWEEP_INTERVAL = float(os.environ.get("CACHE_SWEEP_INTERVAL", "60"))
+CACHE_MAX_OPTIONS_MB = float(os.environ.get("CACHE_MAX_OPTIONS_MB", "512"))
+CACHE_MAX_OPTIONS_ENTRIES = int(os.environ.get("CACHE_MAX_OPTIONS_ENTRIES", "200"))
+CACHE_MAX_EXPIRY_CHAINS_MB = float(os.environ.get("CACHE_MAX_EXPIRY_CHAINS_MB", "256"))
+CACHE_MAX_PRICE_HISTORY_MB = float(os.environ.get("CACHE_MAX_PRICE_HISTORY_MB", "64"))
+
+# Market-hours-aware TTLs: short while the market is open, valid until the next
+# open while it is closed. Set CACHE_MARKET_HOURS_TTL=false for the fixed TTLs.
+CACHE_MARKET_HOURS_TTL = os.environ.get("CACHE_MARKET_HOURS_TTL", "true").lower() in ("1", "true", "yes")
+CACHE_OPEN_TTL = {
+    'ticker_data': float(os.environ.get("CACHE_OPEN_TTL_TICKER_DATA", "300")),  # 5 minutes
+    'options_data': float(os.environ.get("CACHE_OPEN_TTL_OPTIONS_DATA", "900")),  # 15 minutes
+    'unusualness_scores': float(os.environ.get("CACHE_OPEN_TTL_UNUSUALNESS_SCORES", "900")),  # 15 minutes
+    'expiry_chains': float(os.environ.get("CACHE_OPEN_TTL_EXPIRY_CHAINS", "1800"))  # 30 minutes
+}
+
+# Cached option chains keep only the columns scoring reads, downcast to float32.
+# CACHE_KEEP_FULL_CHAINS=true also persists the chains as fetched, for
+# get_full_options_data.
+CACHE_COMPACT_CHAINS = os.environ.get("CACHE_COMPACT_CHAINS", "true").lower() in ("1", "true", "yes")
+CACHE_KEEP_FULL_CHAINS = os.environ.get("CACHE_KEEP_FULL_CHAINS", "false").lower() in ("1", "true", "yes")
+
+# Cache backend: "local" keeps per-process entry files; "sqlite" shares one
+# database (CACHE_SQLITE_PATH, default cache/cache.sqlite3) between all workers
+# on the host, so running uvicorn --workers N fetches each ticker once.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "local").lower()
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH")
+
+cache = EnhancedCache(
+    flush_interval=CACHE_FLUSH_INTERVAL,
+    flush_max_dirty=CACHE_FLUSH_MAX_DIRTY,
+    sweep_interval=CACHE_SWEEP_INTERVAL,
+    max_entries={'options_data': CACHE_MAX_OPTIONS_ENTRIES},
+    max_bytes={
+        'options_data': int(CACHE_MAX_OPTIONS_MB * 1024 * 1024),
+        'expiry_chains': int(CACHE_MAX_EXPIRY_CHAINS_MB * 1024 * 1024),
+        'price_history': int(CACHE_MAX_PRICE_HISTORY_MB * 1024 * 1024)
+    },
+    ttl_policies={namespace: MarketHoursTTL(open_ttl) for namespace, open_ttl in CACHE_OPEN_TTL.items()}
+    if CACHE_MARKET_HOURS_TTL else None,
+    backend=CACHE_BACKEND,
+    sqlite_path=CACHE_SQLITE_PATH,
+    compact_chains=CACHE_COMPACT_CHAINS,
+    keep_full_chains=CACHE_KEEP_FULL_CHAINS
+)
+
+# Daily price history kept in the cache's price_history namespace. Realized vol
+# over 20, 30 and 60 sessions is precomputed once per close; scoring uses
+# SCORING_HV_WINDOW, or every close once a younger series has 20 of them.
+# The default of 40 returns matches the 60d history scoring used to fetch,
+# so scores are unchanged; set 30 for the conventional one-month window.
+SCORING_HV_WINDOW = int(os.environ.get("SCORING_HV_WINDOW", "40"))
+
+price_history = PriceHistoryStore(cache, windows=sorted({*REALIZED_VOL_WINDOWS, SCORING_HV_WINDOW}))
+
+# Intraday snapshots: every chain fetch is appended to an on-disk store so
+# scores and unusual-option scans can look at volume traded between refreshes
+# (?delta=true) instead of only the session's cumulative volume. Off unless
+# SNAPSHOTS_ENABLED=true, since every fetch then also writes to disk.
+SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS_ENABLED", "false").lower() in ("1", "true", "yes")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "./snapshots")
+SNAPSHOT_RETENTION_DAYS = int(os.environ.get("SNAPSHOT_RETENTION_DAYS", "5"))
+
+snapshot_store = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOTS_ENABLED else None
 
-# Rate limiting with much longer delays to prevent blocking
-last_yahoo_request = datetime.now() - timedelta(seconds=10)
-MIN_REQUEST_INTERVAL = 5.0  # 5 seconds between Yahoo Finance requests
+async def cache_sweep_loop():
+    """Periodically expire stale entries so memory doesn't hold dead data"""
+    while True:
+        await asyncio.sleep(cache.sweep_interval)
+        removed = cache.sweep_expired()
+        if removed:
+            logger.info(f"Swept {removed} expired cache entries")
+        if snapshot_store is not None:
+            try:
+                await cache.run_store(snapshot_store.prune, SNAPSHOT_RETENTION_DAYS)
+            except Exception as e:
+                logger.error(f"Error pruning snapshots: {str(e)}")
+
+# Upstream data provider: live yfinance by default. "record" also saves every
+# response under REPLAY_DIR; "replay" serves those recordings offline with
+# simulated latency and no rate limit, for load testing.
+DATA_PROVIDER = os.environ.get("DATA_PROVIDER", "yfinance").lower()
+REPLAY_DIR = os.environ.get("REPLAY_DIR", "./replay")
+REPLAY_LATENCY_MS = float(os.environ.get("REPLAY_LATENCY_MS", "0"))
+REPLAY_JITTER_MS = float(os.environ.get("REPLAY_JITTER_MS", "0"))
+REPLAY_FALLBACK_TICKER = os.environ.get("REPLAY_FALLBACK_TICKER")
+
+data_provider = create_provider(DATA_PROVIDER, replay_dir=REPLAY_DIR,
+                                latency=REPLAY_LATENCY_MS / 1000, jitter=REPLAY_JITTER_MS / 1000,
+                                fallback_ticker=REPLAY_FALLBACK_TICKER)
+
+# Upstream rate limiting: a token bucket with burst capacity and priority lanes.
+# Point YAHOO_LIMITER_STATE_FILE at a shared path to give all workers one budget;
+# with a shared cache it defaults to one next to the cache (set it empty to opt out).
+YAHOO_RATE_PER_MINUTE = float(os.environ.get("YAHOO_RATE_PER_MINUTE", "20"))
+YAHOO_BURST = int(os.environ.get("YAHOO_BURST", "5"))
+YAHOO_LIMITER_STATE_FILE = os.environ.get(
+    "YAHOO_LIMITER_STATE_FILE",
+    os.path.join(cache.cache_dir, "yahoo_limiter.json") if cache.shared and SHARED_STATE_SUPPORTED else None
+) or None
+
+yahoo_limiter = TokenBucketLimiter(YAHOO_RATE_PER_MINUTE, YAHOO_BURST, YAHOO_LIMITER_STATE_FILE)
 
-def rate_limited_request():
+# yfinance is synchronous, so every upstream call runs on this bounded pool
+# instead of the event loop
+YAHOO_EXECUTOR_WORKERS = 4
+yahoo_executor = ThreadPoolExecutor(max_workers=YAHOO_EXECUTOR_WORKERS, thread_name_prefix="yahoo")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking yfinance call on the Yahoo executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(yahoo_executor, partial(func, *args, **kwargs))
+
+async def rate_limited_request(priority=PRIORITY_INTERACTIVE):
     """Ensure we don't exceed Yahoo Finance rate limits"""
-    global last_yahoo_request
-    now = datetime.now()
-    elapsed = (now - last_yahoo_request).total_seconds()
-    
-    if elapsed < MIN_REQUEST_INTERVAL:
-        sleep_time = MIN_REQUEST_INTERVAL - elapsed + random.uniform(0.1, 1.0)  # Add jitter
-        logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-        time.sleep(sleep_time)
-    
-    last_yahoo_request = datetime.now()
+    waited = await yahoo_limiter.acquire(priority)
+    LIMITER_WAIT.observe(waited, PRIORITY_NAMES[priority])
+    if waited > 0.5:
+        logger.info(f"Rate limiting: waited {waited:.2f} seconds ({PRIORITY_NAMES[priority]} lane)")
+
+async def yahoo_request(func, *args, priority=PRIORITY_INTERACTIVE, max_retries=3, **kwargs):
+    """Make one rate-limited data provider call with exponential backoff.
 
-def get_ticker_with_backoff(ticker, max_retries=3):
-    """Get Yahoo Finance ticker with exponential backoff for rate limiting"""
+    Retries queue in the retry lane so they never jump ahead of fresh
+    interactive work. Providers that aren't rate limited skip the limiter.
+    """
+    call = getattr(func, '__name__', 'call')
     retry_count = 0
-    while retry_count < max_retries:
+    while True:
+        if data_provider.rate_limited:
+            await rate_limited_request(PRIORITY_RETRY if retry_count else priority)
+        started = time.perf_counter()
         try:
-            rate_limited_request()
-            logger.info(f"Attempting to get Yahoo Finance data for {ticker}")
-            return yf.Ticker(ticker)
+            latency = data_provider.simulated_latency()
+            if latency > 0:
+                await asyncio.sleep(latency)
+            if not data_provider.blocking:
+                result = func(*args, **kwargs)
+            else:
+                result = await run_blocking(func, *args, **kwargs)
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, call, 'ok')
+            return result
+        except SnapshotNotFound:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, call, 'error')
+            UPSTREAM_ERRORS.inc(call)
+            raise  # a missing recording won't appear on retry
         except Exception as e:
-            logger.warning(f"Error getting ticker {ticker} (attempt {retry_count+1}/{max_retries}): {str(e)}")
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, call, 'error')
+            UPSTREAM_ERRORS.inc(call)
             retry_count += 1
-            if retry_count < max_retries:
-                # Exponential backoff with jitter
-                sleep_time = (2 ** retry_count) * 5 + (random.random() * 3)
-                logger.info(f"Retrying in {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
-    
-    raise Exception(f"Failed to get ticker after {max_retries} attempts")
+            logger.warning(f"Yahoo Finance request failed (attempt {retry_count}/{max_retries}): {str(e)}")
+            if retry_count >= max_retries:
+                raise
+            UPSTREAM_RETRIES.inc(call)
+            # Exponential backoff with jitter
+            sleep_time = (2 ** retry_count) * 5 + (random.random() * 3)
+            logger.info(f"Retrying in {sleep_time:.2f} seconds...")
+            await asyncio.sleep(sleep_time)
+
+# Single-flight registry: concurrent cache misses for the same key share one
+# in-flight upstream fetch instead of each hitting Yahoo
+inflight_fetches: Dict[str, asyncio.Task] = {}
+fetch_stats = {
+    'cache_hits': 0,
+    'upstream_fetches': 0,
+    'coalesced_requests': 0,
+    'shared_waits': 0
+}
+
+# With a shared cache, a worker fetching a key holds a lease on it; other
+# workers poll the cache for its result instead of fetching the same ticker
+FETCH_LEASE_SECONDS = float(os.environ.get("FETCH_LEASE_SECONDS", "120"))
+FETCH_LEASE_POLL_INTERVAL = float(os.environ.get("FETCH_LEASE_POLL_INTERVAL", "0.5"))
+
+async def shared_fetch(key, fetch, recheck):
+    """Fetch under a cross-worker lease, or wait for the worker holding it.
+
+    recheck() is a coroutine returning the cached result once the lease
+    holder has stored it.
+    If the holder releases the lease without a result, or dies and lets the
+    lease lapse, this worker takes the lease and fetches itself.
+    """
+    lease = f"fetch:{key}"
+    while not await cache.acquire_lease(lease, FETCH_LEASE_SECONDS):
+        fetch_stats['shared_waits'] += 1
+        logger.info(f"Waiting for another worker fetching {key}")
+        while await cache.lease_active(lease):
+            await asyncio.sleep(FETCH_LEASE_POLL_INTERVAL)
+            result = await recheck()
+            if result:
+                return result
+        result = await recheck()
+        if result:
+            return result
+    try:
+        # Another worker may have finished between our cache miss and the lease
+        result = await recheck()
+        if result:
+            return result
+        return await fetch()
+    finally:
+        # Waiting workers recheck the store once the lease goes, so the result
+        # must be saved before it does
+        await cache.flush()
+        await cache.release_lease(lease)
+
+async def single_flight(key, fetch, recheck=None):
+    """Run fetch() once per key, letting concurrent callers await the same result.
+
+    With a shared cache and a recheck coroutine, the fetch is also
+    coordinated with other workers through shared_fetch().
+    """
+    task = inflight_fetches.get(key)
+    if task is not None:
+        fetch_stats['coalesced_requests'] += 1
+        logger.info(f"Joining in-flight fetch for {key}")
+    else:
+        fetch_stats['upstream_fetches'] += 1
+        if cache.shared and recheck is not None:
+            task = asyncio.ensure_future(shared_fetch(key, fetch, recheck))
+        else:
+            task = asyncio.ensure_future(fetch())
+        inflight_fetches[key] = task
+        task.add_done_callback(lambda _: inflight_fetches.pop(key, None))
+    # Shield so a disconnecting client doesn't cancel the fetch for everyone else
+    return await asyncio.shield(task)
+
+async def get_options_data(ticker, priority=PRIORITY_INTERACTIVE, allow_stale=True):
+    """Fetch options data for given ticker with caching.
 
-def get_options_data(ticker):
-    """Fetch options data for given ticker with caching"""
+    An entry past its TTL but within its stale grace is returned immediately
+    and refreshed in the background; check cache.is_stale() on the result.
+    """
     ticker = ticker.upper()
     
     # Check cache first
-    cached_data = cache.get_options_data(ticker)
+    cached_data = await cache.get_options_data(ticker, allow_stale=allow_stale)
     if cached_data:
-        logger.info(f"Using cached options data for {ticker}")
+        fetch_stats['cache_hits'] += 1
+        if cache.is_stale('options_data', cached_data):
+            logger.info(f"Serving stale options data for {ticker} while refreshing")
+            schedule_refresh(ticker)
+        else:
+            logger.info(f"Using cached options data for {ticker}")
         return cached_data
     
+    return await single_flight(f"options:{ticker}", partial(fetch_options_data, ticker, priority),
+                               partial(cache.get_options_data, ticker))
+
+# Background refreshes for stale-while-revalidate, at most one per ticker
+refresh_tasks: Dict[str, asyncio.Task] = {}
+REFRESH_AHEAD_INTERVAL = float(os.environ.get("REFRESH_AHEAD_INTERVAL", "60"))
+REFRESH_AHEAD_MIN_HITS = int(os.environ.get("REFRESH_AHEAD_MIN_HITS", "3"))
+REFRESH_AHEAD_FRACTION = float(os.environ.get("REFRESH_AHEAD_FRACTION", "0.8"))
+
+def schedule_refresh(ticker, force=False):
+    """Start a background refresh of a ticker's options data and score unless one is running"""
+    ticker = ticker.upper()
+    if ticker in refresh_tasks:
+        return
+    task = asyncio.create_task(refresh_ticker(ticker, force))
+    refresh_tasks[ticker] = task
+    task.add_done_callback(lambda _: refresh_tasks.pop(ticker, None))
+
+async def refresh_ticker(ticker, force=False):
+    """Refetch a ticker's options data if needed and rescore it.
+
+    Without force, chains that are still fresh are only rescored; force
+    refetches them regardless, which is what refresh-ahead needs.
+    """
+    try:
+        cached = await cache.get_options_data(ticker)
+        options_data = None if force else cached
+        if options_data is None:
+            since = cache._timestamp(cached) if cached else None
+            
+            async def recheck():
+                # Another worker's refetch counts, the entry being refreshed ahead doesn't
+                entry = await cache.get_options_data(ticker)
+                return entry if entry and (since is None or cache._timestamp(entry) > since) else None
+            
+            # Shares the single-flight key, so user requests that miss meanwhile join it
+            options_data = await single_flight(
+                f"options:{ticker}", partial(fetch_options_data, ticker, PRIORITY_BACKGROUND), recheck)
+        if options_data:
+            cache.set_unusualness_score(ticker, build_score_data(ticker, options_data), options_data)
+            logger.info(f"Refreshed options data and score for {ticker}")
+    except Exception as e:
+        logger.error(f"Error refreshing {ticker} in the background: {str(e)}")
+
+async def refresh_ahead_loop():
+    """Refresh frequently requested tickers shortly before their options data expires"""
+    while True:
+        await asyncio.sleep(REFRESH_AHEAD_INTERVAL)
+        for ticker in cache.popular_expiring('options_data', REFRESH_AHEAD_MIN_HITS, REFRESH_AHEAD_FRACTION):
+            schedule_refresh(ticker, force=True)
+
+async def get_current_price(ticker, priority=PRIORITY_INTERACTIVE):
+    """Get the current price for a ticker with caching"""
+    ticker = ticker.upper()
+    
+    cached_data = await cache.get_ticker_data(ticker)
+    if cached_data:
+        fetch_stats['cache_hits'] += 1
+        return cached_data['price']
+    
+    return await single_flight(f"price:{ticker}", partial(fetch_current_price, ticker, priority),
+                               partial(get_cached_price, ticker))
+
+async def get_cached_price(ticker):
+    """Cached price or None; the recheck for a shared price fetch"""
+    cached_data = await cache.get_ticker_data(ticker)
+    return cached_data['price'] if cached_data else None
+
+async def fetch_current_price(ticker, priority=PRIORITY_INTERACTIVE):
+    """Fetch the current price from Yahoo Finance and cache it"""
+    source = data_provider.ticker(ticker)
+    current_price = await yahoo_request(source.quote, priority=priority)
+    if not current_price:
+        current_price = (await yahoo_request(source.history, "1d", priority=priority))['Close'].iloc[-1]
+    
+    # Cache the price
+    cache.set_ticker_data(ticker, current_price)
+    return current_price
+
+async def get_price_history(ticker, source, priority=PRIORITY_INTERACTIVE):
+    """Daily history for a ticker, downloading only the sessions the store is missing"""
+    period = await price_history.period_needed(ticker)
+    if period is None:
+        logger.info(f"Price history for {ticker} is current, skipping download")
+        return await price_history.get(ticker)
+    bars = await yahoo_request(source.history, period, priority=priority)
+    return await price_history.merge(ticker, bars)
+
+async def record_snapshot(ticker, expiry, calls, puts):
+    """Append a freshly fetched chain to the snapshot store, off the event loop"""
+    if snapshot_store is None:
+        return
+    try:
+        # Appends write files under a lock shared with other workers
+        await cache.run_store(snapshot_store.append, ticker, expiry, calls, puts)
+    except Exception as e:
+        logger.error(f"Error recording {expiry} snapshot for {ticker}: {str(e)}")
+
+async def fetch_option_chain(source, expiry, priority=PRIORITY_INTERACTIVE):
+    """Fetch one expiry's option chain in a single upstream request, returning (calls, puts)"""
+    return await yahoo_request(source.option_chain, expiry, priority=priority)
+
+async def fetch_options_data(ticker, priority=PRIORITY_INTERACTIVE):
+    """Fetch fresh options data from Yahoo Finance and cache it"""
     try:
         logger.info(f"Fetching fresh options data for {ticker}")
-        # Add even longer delay before first request
-        time.sleep(random.uniform(1.0, 3.0))
         
-        stock = get_ticker_with_backoff(ticker)
+        # Opening a source is lazy, so it costs no upstream request
+        source = data_provider.ticker(ticker)
         
         # Get all available expiration dates
         try:
-            rate_limited_request()
-            expiration_dates = stock.options
+            expiration_dates = await yahoo_request(source.expirations, priority=priority)
             
             if not expiration_dates:
                 logger.warning(f"No options data available for {ticker}")
@@ -300,61 +1063,48 @@ def get_options_data(ticker):
                     target_date = date
                     break
             
-            if target_date is None and len(expiration_dates) > 1:
-                target_date = expiration_dates[1]
-            else:
-                target_date = nearest_date
-            
-            # Get options chains for both dates with extra delays
-            rate_limited_request()
-            time.sleep(1.0)  # Extra delay
-            calls_near = stock.option_chain(nearest_date).calls
-            
-            rate_limited_request()
-            time.sleep(1.0)  # Extra delay
-            puts_near = stock.option_chain(nearest_date).puts
+            if target_date is None:
+                target_date = expiration_dates[1] if len(expiration_dates) > 1 else nearest_date
             
-            rate_limited_request()
-            time.sleep(1.0)  # Extra delay
-            calls_target = stock.option_chain(target_date).calls
-            
-            rate_limited_request()
-            time.sleep(1.0)  # Extra delay
-            puts_target = stock.option_chain(target_date).puts
+            # Each expiry's chain is fetched once and split into calls/puts locally
+            calls_near, puts_near = await fetch_option_chain(source, nearest_date, priority)
+            await record_snapshot(ticker, nearest_date, calls_near, puts_near)
+            if target_date == nearest_date:
+                calls_target, puts_target = calls_near, puts_near
+            else:
+                calls_target, puts_target = await fetch_option_chain(source, target_date, priority)
+                await record_snapshot(ticker, target_date, calls_target, puts_target)
             
-            # Get current stock price and historical data
+            # Daily history comes from the price-history store, which downloads only
+            # the sessions it is missing. Its last close doubles as the price lookup,
+            # so there is no separate info/1d history request
+            hist_data = None
+            hist_vol = None
             current_price = None
             try:
-                rate_limited_request()
-                time.sleep(1.0)  # Extra delay
-                current_price = stock.info.get('regularMarketPrice')
+                history = await get_price_history(ticker, source, priority)
+                hist_data = history['history']
+                hist_vol = history['realized_vol'].get(SCORING_HV_WINDOW)
+                if not hist_data.empty:
+                    current_price = float(hist_data['Close'].iloc[-1])
             except Exception as e:
-                logger.warning(f"Error getting price from info for {ticker}: {str(e)}")
-                current_price = None
+                logger.warning(f"Could not get historical data for {ticker}: {str(e)}")
+                hist_data = pd.DataFrame()  # Empty DataFrame
             
             if not current_price:
                 try:
-                    rate_limited_request()
-                    time.sleep(1.0)  # Extra delay
-                    current_price = stock.history(period="1d")['Close'].iloc[-1]
+                    current_price = await yahoo_request(source.quote, priority=priority)
                 except Exception as e:
-                    logger.warning(f"Error getting price from history for {ticker}: {str(e)}")
-                    # If still no price, try another approach
-                    try:
-                        current_price = calls_near['strike'].median()  # Use median strike price as estimate
-                    except Exception as e:
-                        logger.error(f"Could not determine price for {ticker}: {str(e)}")
-                        current_price = 100.0  # Default fallback
+                    logger.warning(f"Error getting price from info for {ticker}: {str(e)}")
+                    current_price = None
             
-            # Get historical data
-            hist_data = None
-            try:
-                rate_limited_request()
-                time.sleep(1.0)  # Extra delay
-                hist_data = stock.history(period="60d")
-            except Exception as e:
-                logger.warning(f"Could not get historical data for {ticker}: {str(e)}")
-                hist_data = pd.DataFrame()  # Empty DataFrame
+            if not current_price:
+                # If still no price, try another approach
+                try:
+                    current_price = calls_near['strike'].median()  # Use median strike price as estimate
+                except Exception as e:
+                    logger.error(f"Could not determine price for {ticker}: {str(e)}")
+                    current_price = 100.0  # Default fallback
             
             options_data = {
                 'calls_near': calls_near,
@@ -363,14 +1113,16 @@ def get_options_data(ticker):
                 'puts_target': puts_target,
                 'current_price': current_price,
                 'historical_data': hist_data,
+                'hist_vol': hist_vol,
                 'nearest_date': nearest_date,
-                'target_date': target_date
+                'target_date': target_date,
+                # Kept for term-structure scans, which fetch the other expiries on demand
+                'expirations': list(expiration_dates)
             }
             
             # Cache the data
-            cache.set_options_data(ticker, options_data)
-            
-            return options_data
+            # Return the cached entry so callers see its version
+            return cache.set_options_data(ticker, options_data)
         except Exception as e:
             logger.error(f"Error fetching options chain for {ticker}: {str(e)}")
             return None
@@ -384,22 +1136,29 @@ def calculate_unusualness_score(options_data):
     try:
         scores = []
         
+        # Cached chains are compact float32; reductions read their columns as float64
         calls_near = options_data['calls_near']
         puts_near = options_data['puts_near']
         calls_target = options_data['calls_target']
         puts_target = options_data['puts_target']
         current_price = options_data['current_price']
-        hist_data = options_data['historical_data']
+        # ATM and OTM windows are binary searches over the strike-sorted near chains
+        presorted = options_data.get('strikes_sorted', False)
+        sorted_calls_near, calls_near_index = strike_index(calls_near, presorted)
+        sorted_puts_near, puts_near_index = strike_index(puts_near, presorted)
         
         def calc_vol_oi_ratio(options_df):
             try:
-                filtered = options_df[options_df['openInterest'] > 10]
-                if len(filtered) == 0:
+                open_interest = options_df['openInterest'].to_numpy(dtype=np.float64)
+                liquid = open_interest > 10
+                if not liquid.any():
                     return 0
                     
-                ratios = filtered['volume'] / filtered['openInterest']
-                ratios = ratios.clip(upper=20)
-                return ratios.mean()
+                ratios = options_df['volume'].to_numpy(dtype=np.float64)[liquid] / open_interest[liquid]
+                ratios = np.minimum(ratios, 20)
+                # Skips missing volume like Series.mean
+                count = np.count_nonzero(~np.isnan(ratios))
+                return np.nansum(ratios) / count if count else np.nan
             except Exception as e:
                 logger.warning(f"Error calculating vol/oi ratio: {str(e)}")
                 return 0
@@ -417,8 +1176,10 @@ def calculate_unusualness_score(options_data):
         
         def calc_pcr(calls, puts):
             try:
-                call_value = (calls['volume'] * calls['lastPrice']).sum()
-                put_value = (puts['volume'] * puts['lastPrice']).sum()
+                call_value = np.nansum(calls['volume'].to_numpy(dtype=np.float64) *
+                                       calls['lastPrice'].to_numpy(dtype=np.float64))
+                put_value = np.nansum(puts['volume'].to_numpy(dtype=np.float64) *
+                                      puts['lastPrice'].to_numpy(dtype=np.float64))
                 
                 if call_value == 0:
                     return 5.0
@@ -434,18 +1195,15 @@ def calculate_unusualness_score(options_data):
         pcr_score = min(pcr_score, 3)
         scores.append(pcr_score)
         
-        if isinstance(hist_data, pd.DataFrame) and 'Close' in hist_data.columns and len(hist_data) >= 20:
+        hist_vol = options_hist_vol(options_data)
+        if hist_vol is not None:
             try:
-                returns = hist_data['Close'].pct_change().dropna()
-                hist_vol = returns.std() * np.sqrt(252) * 100
-                
-                atm_calls = calls_near[(calls_near['strike'] >= current_price * 0.95) & 
-                                    (calls_near['strike'] <= current_price * 1.05)]
-                atm_puts = puts_near[(puts_near['strike'] >= current_price * 0.95) & 
-                                    (puts_near['strike'] <= current_price * 1.05)]
+                atm_calls = sorted_calls_near.iloc[calls_near_index.atm(current_price)]
+                atm_puts = sorted_puts_near.iloc[puts_near_index.atm(current_price)]
                 
                 if len(atm_calls) > 0 and len(atm_puts) > 0:
-                    avg_iv = (atm_calls['impliedVolatility'].mean() + atm_puts['impliedVolatility'].mean()) / 2 * 100
+                    avg_iv = (widen(atm_calls['impliedVolatility']).mean() +
+                              widen(atm_puts['impliedVolatility']).mean()) / 2 * 100
                     
                     iv_hv_ratio = avg_iv / hist_vol if hist_vol > 0 else 2
                     
@@ -459,16 +1217,16 @@ def calculate_unusualness_score(options_data):
         else:
             scores.append(1.0)
         
-        def calc_skew(calls, puts, current_price):
+        def calc_skew(current_price):
             try:
-                otm_calls = calls[calls['strike'] > current_price * 1.1]
-                otm_puts = puts[puts['strike'] < current_price * 0.9]
+                otm_calls = sorted_calls_near.iloc[calls_near_index.otm_calls(current_price)]
+                otm_puts = sorted_puts_near.iloc[puts_near_index.otm_puts(current_price)]
                 
                 if len(otm_calls) == 0 or len(otm_puts) == 0:
                     return 1.0
                     
-                avg_call_iv = otm_calls['impliedVolatility'].mean()
-                avg_put_iv = otm_puts['impliedVolatility'].mean()
+                avg_call_iv = widen(otm_calls['impliedVolatility']).mean()
+                avg_put_iv = widen(otm_puts['impliedVolatility']).mean()
                 
                 if avg_call_iv == 0:
                     return 3.0
@@ -481,7 +1239,7 @@ def calculate_unusualness_score(options_data):
                 logger.warning(f"Error calculating skew: {str(e)}")
                 return 1.0
             
-        skew_score = calc_skew(calls_near, puts_near, current_price)
+        skew_score = calc_skew(current_price)
         scores.append(skew_score)
         
         total_score = sum(scores)
@@ -552,107 +1310,284 @@ def interpret_score(score, components, raw_data):
     
     return interpretation
 
-def get_unusual_options(ticker):
-    """Get unusual options for a ticker with caching"""
+def find_unusual_options(ticker, options_data):
+    """Find unusual options in the nearest expiry, highest volume/OI ratio first"""
+    unusual = nearest_unusual_options(ticker, options_data)
+    return unusual.records(unusual.ranked())
+
+def nearest_unusual_options(ticker, options_data):
+    """The unusual contracts of an options_data snapshot's nearest expiry"""
+    try:
+        chain = (options_data['nearest_date'], options_data['calls_near'], options_data['puts_near'])
+        return UnusualOptions(ticker, options_data['current_price'], [chain])
+    except Exception as e:
+        logger.error(f"Error processing options for {ticker}: {str(e)}")
+        return UnusualOptions(ticker, None)
+
+def derived_activity(ticker, options_data):
+    """Activity memoized for an options snapshot: its nearest-expiry unusual
+    contracts and, per expiration selection, its term-structure scans"""
+    # days_to_expiry depends on today's date, so the date is part of the key
+    version = options_data.get('version')
+    key = (version, datetime.now().date()) if version is not None else None
+    derived = cache.get_derived(ticker, key)
+    if derived is None:
+        derived = {'unusual': None, 'summary': None, 'term_structure': {}}
+        cache.set_derived(ticker, key, derived)
+    return derived
+
+def summarize_memoized(memo, offset, limit, filters):
+    """One page of memo['unusual']; the unfiltered summary is kept in memo['summary']"""
+    if offset == 0 and limit is None and all(value is None for value in filters.values()):
+        if memo['summary'] is None:
+            with SCORING_LATENCY.time('activity'):
+                memo['summary'] = memo['unusual'].summarize()
+        return memo['summary']
+    with SCORING_LATENCY.time('activity'):
+        return memo['unusual'].summarize(offset, limit, **filters)
+
+async def get_options_activity(ticker, offset=0, limit=None, **filters):
+    """Get one page of the unusual-options summary for a ticker.
+
+    The unusual contracts are memoized per options snapshot, so a request
+    only filters and ranks them; the unfiltered summary is memoized whole.
+    """
     ticker = ticker.upper()
     
-    options_data = get_options_data(ticker)
+    options_data = await get_options_data(ticker)
     if not options_data:
-        return []
-        
-    current_price = options_data['current_price']
-    nearest_date = options_data['nearest_date']
-    calls_near = options_data['calls_near']
-    puts_near = options_data['puts_near']
+        return {
+            **UnusualOptions(ticker, None).summarize(offset, limit),
+            'stale': False,
+            'as_of': None
+        }
+    
+    derived = derived_activity(ticker, options_data)
+    if derived['unusual'] is None:
+        with SCORING_LATENCY.time('activity'):
+            derived['unusual'] = nearest_unusual_options(ticker, options_data)
     
-    unusual_options = []
+    activity = summarize_memoized(derived, offset, limit, filters)
+    return {
+        **activity,
+        'stale': cache.is_stale('options_data', options_data),
+        'as_of': options_data['timestamp']
+    }
+
+# Term-structure scans: /ticker/{ticker}?term_structure=true ranks unusual
+# activity across up to TERM_STRUCTURE_MAX_EXPIRIES expirations (0 for all).
+# Each expiry is fetched concurrently through the rate limiter and cached on its own.
+TERM_STRUCTURE_MAX_EXPIRIES = int(os.environ.get("TERM_STRUCTURE_MAX_EXPIRIES", "8"))
+
+def select_expirations(expirations, max_expiries):
+    """Up to max_expiries expirations spread evenly from the front month to the longest LEAPS"""
+    expirations = list(expirations)
+    if not max_expiries or len(expirations) <= max_expiries:
+        return expirations
+    picks = np.unique(np.round(np.linspace(0, len(expirations) - 1, max_expiries)).astype(int))
+    return [expirations[i] for i in picks]
+
+async def get_expiry_chain(ticker, expiry, priority=PRIORITY_INTERACTIVE):
+    """Get one expiry's calls and puts with caching"""
+    cached = await cache.get_expiry_chain(ticker, expiry)
+    if cached:
+        fetch_stats['cache_hits'] += 1
+        return cached
     
+    return await single_flight(f"chain:{ticker}:{expiry}", partial(fetch_expiry_chain, ticker, expiry, priority),
+                               partial(cache.get_expiry_chain, ticker, expiry))
+
+async def fetch_expiry_chain(ticker, expiry, priority=PRIORITY_INTERACTIVE):
     try:
-        for idx, call in calls_near.iterrows():
-            if call['volume'] > 10 and call['openInterest'] > 0:
-                vol_oi_ratio = min(call['volume'] / call['openInterest'], 20) if call['openInterest'] > 10 else 0
-                
-                if vol_oi_ratio >= 2:  # Lowered threshold to find more unusual options
-                    expiry_date = datetime.strptime(nearest_date, '%Y-%m-%d').date()
-                    days_to_expiry = (expiry_date - datetime.now().date()).days
-                    
-                    unusual_options.append({
-                        'underlying_ticker': ticker,
-                        'option_symbol': f"{ticker}C{int(call['strike']*100)}",
-                        'option_type': 'call',
-                        'strike_price': float(call['strike']),
-                        'expiration_date': nearest_date,
-                        'days_to_expiry': days_to_expiry,
-                        'current_volume': int(call['volume']),
-                        'open_interest': int(call['openInterest']),
-                        'implied_volatility': round(float(call['impliedVolatility']) * 100, 2),
-                        'volume_ratio': round(vol_oi_ratio, 2),
-                        'in_the_money': float(call['strike']) < current_price,
-                        'current_stock_price': float(current_price),
-                        'last_price': round(float(call['lastPrice']), 2)
-                    })
-        
-        for idx, put in puts_near.iterrows():
-            if put['volume'] > 10 and put['openInterest'] > 0:
-                vol_oi_ratio = min(put['volume'] / put['openInterest'], 20) if put['openInterest'] > 10 else 0
-                
-                if vol_oi_ratio >= 2:  # Lowered threshold to find more unusual options
-                    expiry_date = datetime.strptime(nearest_date, '%Y-%m-%d').date()
-                    days_to_expiry = (expiry_date - datetime.now().date()).days
-                    
-                    unusual_options.append({
-                        'underlying_ticker': ticker,
-                        'option_symbol': f"{ticker}P{int(put['strike']*100)}",
-                        'option_type': 'put',
-                        'strike_price': float(put['strike']),
-                        'expiration_date': nearest_date,
-                        'days_to_expiry': days_to_expiry,
-                        'current_volume': int(put['volume']),
-                        'open_interest': int(put['openInterest']),
-                        'implied_volatility': round(float(put['impliedVolatility']) * 100, 2),
-                        'volume_ratio': round(vol_oi_ratio, 2),
-                        'in_the_money': float(put['strike']) > current_price,
-                        'current_stock_price': float(current_price),
-                        'last_price': round(float(put['lastPrice']), 2)
-                    })
+        calls, puts = await fetch_option_chain(data_provider.ticker(ticker), expiry, priority)
     except Exception as e:
-        logger.error(f"Error processing options for {ticker}: {str(e)}")
+        logger.error(f"Error fetching {expiry} options chain for {ticker}: {str(e)}")
+        return None
+    await record_snapshot(ticker, expiry, calls, puts)
+    return cache.set_expiry_chain(ticker, expiry, calls, puts)
+
+async def get_term_structure_activity(ticker, max_expiries=None, offset=0, limit=None, **filters):
+    """Unusual-options summary ranked across the expiration curve.
+
+    The near and target expiries come from the ticker's options data; the
+    rest are fetched concurrently, so refreshing the front month never
+    refetches the back of the curve. The unusual contracts are memoized with
+    the options snapshot until one of the other expiries is refetched.
+    """
+    ticker = ticker.upper()
+    
+    options_data = await get_options_data(ticker)
+    if not options_data:
+        return {
+            **UnusualOptions(ticker, None).summarize(offset, limit),
+            'expirations': [],
+            'expirations_available': 0,
+            'stale': False,
+            'as_of': None
+        }
+    
+    expirations = options_data.get('expirations')
+    if expirations is None:
+        # Options data cached before expirations were kept alongside it
+        expirations = await yahoo_request(data_provider.ticker(ticker).expirations)
+    selected = select_expirations(expirations, TERM_STRUCTURE_MAX_EXPIRIES if max_expiries is None else max_expiries)
     
-    unusual_options.sort(key=lambda x: x['volume_ratio'], reverse=True)
-    return unusual_options
+    known = {
+        options_data['nearest_date']: (options_data['calls_near'], options_data['puts_near']),
+        options_data['target_date']: (options_data['calls_target'], options_data['puts_target'])
+    }
+    # When each chain was cached; the snapshot's own chains are covered by its version
+    fetched_at = {}
+    missing = [expiry for expiry in selected if expiry not in known]
+    fetched = await asyncio.gather(*(get_expiry_chain(ticker, expiry) for expiry in missing))
+    for expiry, entry in zip(missing, fetched):
+        if entry:
+            known[expiry] = (entry['calls'], entry['puts'])
+            fetched_at[expiry] = entry['timestamp']
+    
+    chains = [(expiry, *known[expiry]) for expiry in selected if expiry in known]
+    scans = derived_activity(ticker, options_data)['term_structure']
+    memo = scans.get(tuple(selected))
+    chains_key = tuple((expiry, fetched_at.get(expiry)) for expiry, _, _ in chains)
+    if memo is None or memo['chains'] != chains_key:
+        with SCORING_LATENCY.time('activity'):
+            memo = scans[tuple(selected)] = {
+                'chains': chains_key,
+                'unusual': UnusualOptions(ticker, options_data['current_price'], chains),
+                'summary': None
+            }
+    
+    activity = summarize_memoized(memo, offset, limit, filters)
+    return {
+        **activity,
+        'expirations': [expiry for expiry, _, _ in chains],
+        'expirations_available': len(expirations),
+        'stale': cache.is_stale('options_data', options_data),
+        'as_of': options_data['timestamp']
+    }
 
-# API Endpoints
+DELTA_DEFAULT_WINDOW = int(os.environ.get("DELTA_DEFAULT_WINDOW", "1"))
 
-@app.get("/")
-async def root():
-    return {"message": "Options Unusualness API using Yahoo Finance"}
+async def delta_options_data(ticker, options_data, window=1):
+    """options_data with its chains replaced by activity over the last window snapshot intervals.
 
-@app.get("/api-status")
-async def get_api_status():
+    Volume becomes the volume traded between the snapshot window intervals
+    back and the latest one; open interest, prices and IV are the latest.
+    Early in the day fewer intervals may be available, so delta_window holds
+    the number actually diffed. Returns None until today's store holds two
+    snapshots of both expiries.
+    """
+    if snapshot_store is None:
+        return None
+    
+    legs = {}
+    bounds = []
+    intervals = []
+    for suffix, expiry in (('near', options_data['nearest_date']), ('target', options_data['target_date'])):
+        # Memory-mapped reads can fault in pages from disk, so keep them off the event loop
+        snapshots = await cache.run_store(snapshot_store.last, ticker, expiry, max(window, 1) + 1)
+        if len(snapshots) < 2:
+            return None
+        (started, earlier), (ended, later) = snapshots[0], snapshots[-1]
+        legs[f'calls_{suffix}'], legs[f'puts_{suffix}'] = split_sides(chain_delta(earlier, later))
+        bounds.append((started, ended))
+        intervals.append(len(snapshots) - 1)
+    
     return {
-        "status": "operational",
-        "last_yahoo_request": last_yahoo_request.strftime("%Y-%m-%d %H:%M:%S"),
-        "seconds_since_last_request": (datetime.now() - last_yahoo_request).total_seconds(),
-        "min_request_interval": MIN_REQUEST_INTERVAL,
-        "cached_tickers": len(cache.memory_cache['ticker_data']),
-        "cached_options": len(cache.memory_cache['options_data']),
-        "cached_scores": len(cache.memory_cache['unusualness_scores'])
+        **options_data,
+        **legs,
+        'strikes_sorted': False,
+        'delta_from': min(started for started, _ in bounds),
+        'delta_to': max(ended for _, ended in bounds),
+        'delta_window': min(intervals)
     }
 
-@app.get("/unusualness-score/{ticker}")
-async def get_ticker_unusualness_score(ticker: str):
+async def get_delta_options_data(ticker, window=None):
+    """Fetch options data, which records a snapshot when it refreshes, and diff the latest snapshots"""
+    ticker = ticker.upper()
+    options_data = await get_options_data(ticker)
+    if not options_data:
+        return None, None
+    window = DELTA_DEFAULT_WINDOW if window is None else window
+    return options_data, await delta_options_data(ticker, options_data, window)
+
+def delta_markers(delta_data, window):
+    """Response fields describing the delta; window is the number of intervals actually diffed"""
+    requested = DELTA_DEFAULT_WINDOW if window is None else window
+    return {
+        'delta': True,
+        'window': delta_data['delta_window'] if delta_data else requested,
+        'window_requested': requested,
+        'delta_available': delta_data is not None,
+        'delta_from': delta_data['delta_from'] if delta_data else None,
+        'delta_to': delta_data['delta_to'] if delta_data else None
+    }
+
+async def get_delta_activity(ticker, window=None, offset=0, limit=None, **filters):
+    """Unusual options by volume traded between the latest snapshots of the nearest expiry"""
+    options_data, delta_data = await get_delta_options_data(ticker, window)
+    unusual = nearest_unusual_options(ticker, delta_data) if delta_data else UnusualOptions(ticker, None)
+    return {
+        **unusual.summarize(offset, limit, **filters),
+        **delta_markers(delta_data, window),
+        'stale': cache.is_stale('options_data', options_data) if options_data else False,
+        'as_of': options_data['timestamp'] if options_data else None
+    }
+
+def build_score_data(ticker, options_data, result=None):
+    """Score options data, unless a result is passed in, and attach the interpretation"""
+    if result is None:
+        logger.info(f"Calculating unusualness score for {ticker}")
+        with SCORING_LATENCY.time('score'):
+            result = calculate_unusualness_score(options_data)
+    
+    interpretation = interpret_score(result['score'], result['components'], result['raw_data'])
+    
+    return {
+        'ticker': ticker,
+        'current_price': options_data['current_price'],
+        'score': result['score'],
+        'interpretation': interpretation,
+        'components': result['components'],
+        'nearest_expiry': options_data['nearest_date'],
+        'target_expiry': options_data['target_date']
+    }
+
+async def get_cached_score_data(ticker, allow_stale=True):
+    """Cached score with stale/as_of markers, scheduling a refresh if it is stale"""
+    cached_score = await cache.get_unusualness_score(ticker, allow_stale=allow_stale)
+    if not cached_score:
+        return None
+    
+    stale = cache.is_stale('unusualness_scores', cached_score)
+    if stale:
+        logger.info(f"Serving stale unusualness score for {ticker} while refreshing")
+        schedule_refresh(ticker)
+    else:
+        logger.info(f"Using cached unusualness score for {ticker}")
+    return score_response(cached_score, stale)
+
+def score_response(score_data, stale):
+    """A cached score as the API returns it, its timestamp reported as as_of"""
+    result = {key: value for key, value in score_data.items() if key != 'timestamp'}
+    return {**result, 'stale': stale, 'as_of': score_data['timestamp']}
+
+async def get_unusualness_score_data(ticker, priority=PRIORITY_INTERACTIVE, allow_stale=True):
+    """Get the scored and interpreted unusualness result for a ticker with caching.
+
+    Results carry stale/as_of markers; a stale score is served immediately
+    while a background refresh replaces it.
+    """
     try:
         ticker = ticker.upper()
-        logger.info(f"Request for unusualness score for {ticker}")
         
         # Check cache first
-        cached_score = cache.get_unusualness_score(ticker)
+        cached_score = await get_cached_score_data(ticker, allow_stale)
         if cached_score:
-            logger.info(f"Using cached unusualness score for {ticker}")
             return cached_score
         
         # Fetch options data (this function has its own caching)
-        options_data = get_options_data(ticker)
+        options_data = await get_options_data(ticker, priority, allow_stale)
         if not options_data:
             logger.warning(f"No options data found for {ticker}")
             return {
@@ -669,25 +1604,17 @@ async def get_ticker_unusualness_score(ticker: str):
                 'target_expiry': None
             }
         
-        logger.info(f"Calculating unusualness score for {ticker}")
-        result = calculate_unusualness_score(options_data)
-        
-        interpretation = interpret_score(result['score'], result['components'], result['raw_data'])
+        score_data = build_score_data(ticker, options_data)
         
-        score_data = {
-            'ticker': ticker,
-            'current_price': options_data['current_price'],
-            'score': result['score'],
-            'interpretation': interpretation,
-            'components': result['components'],
-            'nearest_expiry': options_data['nearest_date'],
-            'target_expiry': options_data['target_date']
-        }
+        if cache.is_stale('options_data', options_data):
+            # Don't cache a score built from stale chains as if it were fresh;
+            # the background refresh will store a proper one
+            return {**score_data, 'stale': True, 'as_of': options_data['timestamp']}
         
         # Cache the result
-        cache.set_unusualness_score(ticker, score_data)
+        score_data = cache.set_unusualness_score(ticker, score_data, options_data)
         
-        return score_data
+        return score_response(score_data, False)
     
     except Exception as e:
         logger.error(f"Error calculating unusualness score for {ticker}: {str(e)}")
@@ -706,54 +1633,354 @@ async def get_ticker_unusualness_score(ticker: str):
             'target_expiry': None
         }
 
+async def get_delta_score_data(ticker, window=None):
+    """Score the activity between the latest snapshots rather than the whole session.
+
+    Delta scores aren't cached: each refresh adds a snapshot and moves the window.
+    """
+    try:
+        options_data, delta_data = await get_delta_options_data(ticker, window)
+    except Exception as e:
+        logger.error(f"Error loading snapshots for {ticker}: {str(e)}")
+        options_data, delta_data = None, None
+    if delta_data is None:
+        return {
+            'ticker': ticker,
+            'score': 0,
+            'interpretation': ["Not enough intraday snapshots yet to score recent activity."],
+            'components': {
+                'volume_oi_ratio': 0,
+                'put_call_ratio': 0,
+                'iv_vs_historical': 0,
+                'skew_analysis': 0
+            },
+            'nearest_expiry': options_data['nearest_date'] if options_data else None,
+            'target_expiry': options_data['target_date'] if options_data else None,
+            **delta_markers(None, window)
+        }
+    return {**build_score_data(ticker, delta_data), **delta_markers(delta_data, window)}
+
+# Batch scoring: cached tickers are answered first, cold ones are fetched through
+# a bounded pool in the background lane so watchlists can't starve interactive lookups
+BATCH_MAX_TICKERS = int(os.environ.get("BATCH_MAX_TICKERS", "500"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+
+def to_ndjson(data):
+    return dumps(data) + b"\n"
+
+async def stream_batch_scores(tickers):
+    cold_tickers = []
+    for ticker in tickers:
+        cached_score = await get_cached_score_data(ticker)
+        if cached_score:
+            yield to_ndjson(cached_score)
+        else:
+            cold_tickers.append(ticker)
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def score_cold_ticker(ticker):
+        async with semaphore:
+            return await get_unusualness_score_data(ticker, PRIORITY_BACKGROUND)
+    
+    tasks = [asyncio.create_task(score_cold_ticker(ticker)) for ticker in cold_tickers]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield to_ndjson(await next_result)
+    finally:
+        # Stop queued work if the client goes away; shared fetches are shielded
+        for task in tasks:
+            task.cancel()
+
+# Background market scanner: periodically scores a fixed universe so the dashboard
+# reads one complete snapshot instead of whatever users happened to look up
+SCANNER_ENABLED = os.environ.get("SCANNER_ENABLED", "false").lower() in ("1", "true", "yes")
+SCANNER_UNIVERSE_FILE = os.environ.get(
+    "SCANNER_UNIVERSE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "universe.txt"))
+SCANNER_INTERVAL = float(os.environ.get("SCANNER_INTERVAL", "3600"))
+SCANNER_CONCURRENCY = int(os.environ.get("SCANNER_CONCURRENCY", "4"))
+
+scan_progress = {
+    'universe_size': 0,
+    'completed': 0,
+    'failed': 0,
+    'started_at': None,
+    'finished_at': None
+}
+
+def load_universe(path):
+    """Read tickers from a file, one per line, ignoring blanks and # comments"""
+    with open(path, 'r') as f:
+        tickers = [line.split('#', 1)[0].strip().upper() for line in f]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+def score_batch(options_by_ticker):
+    with SCORING_LATENCY.time('batch'):
+        return score_many(options_by_ticker)
+
+async def run_market_scan():
+    """Score every ticker in the universe and publish the results as one snapshot"""
+    if cache.memory_cache['analysis_running']:
+        logger.info("Market scan already running, skipping")
+        return
+    
+    tickers = load_universe(SCANNER_UNIVERSE_FILE)
+    cache.memory_cache['analysis_running'] = True
+    scan_progress.update({
+        'universe_size': len(tickers),
+        'completed': 0,
+        'failed': 0,
+        'started_at': datetime.now(),
+        'finished_at': None
+    })
+    logger.info(f"Starting market scan of {len(tickers)} tickers")
+    
+    semaphore = asyncio.Semaphore(SCANNER_CONCURRENCY)
+    scores = {}
+    fetched = {}
+    
+    async def scan_ticker(ticker):
+        cached_score = await get_cached_score_data(ticker, allow_stale=False)
+        if cached_score:
+            scores[ticker] = cached_score
+            scan_progress['completed'] += 1
+            return
+        
+        try:
+            async with semaphore:
+                options_data = await get_options_data(ticker, PRIORITY_BACKGROUND, allow_stale=False)
+        except Exception as e:
+            logger.error(f"Error fetching {ticker} during market scan: {str(e)}")
+            options_data = None
+        if options_data:
+            fetched[ticker] = options_data
+        else:
+            scan_progress['failed'] += 1
+            scan_progress['completed'] += 1
+    
+    try:
+        await asyncio.gather(*(scan_ticker(ticker) for ticker in tickers))
+        
+        # Score every fetched ticker in one vectorized pass; anything the
+        # engine couldn't stack falls back to the per-ticker scorer
+        results = await run_blocking(score_batch, fetched)
+        for ticker, options_data in fetched.items():
+            score_data = cache.set_unusualness_score(
+                ticker, build_score_data(ticker, options_data, results.get(ticker)), options_data)
+            scores[ticker] = score_response(score_data, False)
+            scan_progress['completed'] += 1
+        
+        await cache.set_market_snapshot({
+            'scores': scores,
+            'universe_size': len(tickers),
+            'as_of': datetime.now()
+        })
+        cache.memory_cache['last_updated'] = datetime.now()
+        logger.info(f"Market scan finished: {len(scores)}/{len(tickers)} tickers scored")
+    finally:
+        scan_progress['finished_at'] = datetime.now()
+        cache.memory_cache['analysis_running'] = False
+
+async def market_scan_loop():
+    # With a shared cache every worker runs this loop, but only the lease
+    # holder scans; the others pick up its snapshot from the cache
+    while True:
+        if await cache.acquire_lease('market_scan', SCANNER_INTERVAL * 2):
+            try:
+                await run_market_scan()
+            except Exception as e:
+                logger.error(f"Error running market scan: {str(e)}")
+        await asyncio.sleep(SCANNER_INTERVAL)
+
+# API Endpoints
+
+background_tasks = []
+
+@app.on_event("startup")
+async def startup_event():
+    cache.start_flusher()
+    background_tasks.append(asyncio.create_task(cache_sweep_loop()))
+    background_tasks.append(asyncio.create_task(refresh_ahead_loop()))
+    if SCANNER_ENABLED:
+        background_tasks.append(asyncio.create_task(market_scan_loop()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    yahoo_executor.shutdown(wait=False)
+    # Final flush so nothing changed since the last interval is lost
+    cache.stop_flusher()
+    cache.store_executor.shutdown(wait=False)
+
+@app.get("/")
+async def root():
+    return {"message": "Options Unusualness API using Yahoo Finance"}
+
+@app.get("/api-status")
+async def get_api_status():
+    return {
+        "status": "operational",
+        "data_provider": data_provider.describe(),
+        "rate_limiter": yahoo_limiter.stats(),
+        "cached_tickers": len(cache.memory_cache['ticker_data']),
+        "cached_options": len(cache.memory_cache['options_data']),
+        "cached_scores": len(cache.memory_cache['unusualness_scores']),
+        "pending_cache_writes": len(cache.dirty),
+        "cache_backend": cache.backend,
+        "price_history": price_history.stats,
+        "worker": cache.worker_id,
+        "cache": cache.get_stats(),
+        "market": {
+            "open": is_market_open(),
+            "next_open": next_open(),
+            "next_close": next_close()
+        },
+        "ttl_policies": cache.describe_ttls(),
+        "scanner": {
+            "enabled": SCANNER_ENABLED,
+            "running": cache.memory_cache['analysis_running'],
+            "last_updated": cache.memory_cache['last_updated'],
+            **scan_progress
+        },
+        "inflight_fetches": len(inflight_fetches),
+        "background_refreshes": len(refresh_tasks),
+        **fetch_stats
+    }
+
+def collect_app_metrics():
+    """Export the counters the cache, limiter and fetch layer already keep"""
+    namespaces = EnhancedCache.NAMESPACES
+    stats = cache.stats
+    limiter = yahoo_limiter.stats()
+    
+    yield ('cache_requests_total', 'counter', 'Cache lookups by namespace and result', [
+        ({'namespace': namespace, 'result': result}, stats[namespace][key])
+        for namespace in namespaces
+        for result, key in (('hit', 'hits'), ('stale_hit', 'stale_hits'), ('miss', 'misses'))
+    ])
+    yield ('cache_evictions_total', 'counter', 'Entries evicted from memory by the LRU budget',
+           [({'namespace': namespace}, stats[namespace]['evictions']) for namespace in namespaces])
+    yield ('cache_expired_total', 'counter', 'Entries dropped from memory after their stale grace',
+           [({'namespace': namespace}, stats[namespace]['expired']) for namespace in namespaces])
+    yield ('cache_entries', 'gauge', 'Entries held in memory',
+           [({'namespace': namespace}, len(cache.memory_cache[namespace])) for namespace in namespaces])
+    yield ('cache_pending_writes', 'gauge', 'Changed entries waiting for the write-behind flusher',
+           [({}, len(cache.dirty))])
+    yield ('upstream_limiter_granted_total', 'counter', 'Rate-limiter tokens granted by lane',
+           [({'lane': lane}, count) for lane, count in limiter['granted_by_lane'].items()])
+    yield ('upstream_limiter_queue_depth', 'gauge', 'Requests waiting for a rate-limiter token by lane',
+           [({'lane': lane}, count) for lane, count in limiter['queued_by_lane'].items()])
+    yield ('upstream_limiter_tokens', 'gauge', 'Rate-limiter tokens currently available',
+           [({}, limiter['tokens'])])
+    yield ('upstream_fetches_total', 'counter', 'Cache misses that started an upstream fetch',
+           [({}, fetch_stats['upstream_fetches'])])
+    yield ('coalesced_requests_total', 'counter', 'Requests that joined an in-flight fetch instead of starting one',
+           [({}, fetch_stats['coalesced_requests'])])
+    yield ('fetch_cache_hits_total', 'counter', 'Price and options lookups answered from the cache',
+           [({}, fetch_stats['cache_hits'])])
+    yield ('inflight_fetches', 'gauge', 'Upstream fetches currently running', [({}, len(inflight_fetches))])
+    yield ('background_refreshes', 'gauge', 'Stale-while-revalidate refreshes currently running',
+           [({}, len(refresh_tasks))])
+
+metrics_registry.register_collector(collect_app_metrics)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, upstream, scoring and cache metrics"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/unusualness-score/{ticker}")
+async def get_ticker_unusualness_score(ticker: str, delta: bool = False, window: Optional[int] = None):
+    if window is not None and window < 1:
+        raise HTTPException(status_code=400, detail="window must be at least 1")
+    ticker = ticker.upper()
+    logger.info(f"Request for unusualness score for {ticker}")
+    if delta:
+        return await get_delta_score_data(ticker, window)
+    return await get_unusualness_score_data(ticker)
+
+class BatchScoreRequest(BaseModel):
+    tickers: List[str]
+
+@app.post("/unusualness-scores")
+async def get_batch_unusualness_scores(request: BatchScoreRequest):
+    """Score a watchlist, streaming one NDJSON line per ticker as each completes"""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in request.tickers if t.strip()))
+    if len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TICKERS} tickers per batch")
+    
+    logger.info(f"Batch request for {len(tickers)} unusualness scores")
+    return StreamingResponse(stream_batch_scores(tickers), media_type="application/x-ndjson")
+
+# /ticker responses are encoded by hand: the unusual-options list is encoded
+# once per snapshot and layout, and bodies past this size are gzip/brotli
+# compressed for clients that accept it. layout=columns sends the list as
+# {field: [values]} instead of one object per contract.
+#
+# limit/offset page through the ranking; option_type (call/put), min_ratio,
+# moneyness (itm/otm/atm) and expiry filter it. total counts the contracts
+# passing the filters, and the call/put volumes are over all of them.
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
 @app.get("/ticker/{ticker}")
-async def get_ticker_activity(ticker: str):
+async def get_ticker_activity(request: Request, ticker: str, term_structure: bool = False,
+                              max_expiries: Optional[int] = None, delta: bool = False,
+                              window: Optional[int] = None, layout: str = 'records',
+                              limit: Optional[int] = None, offset: int = 0, min_ratio: Optional[float] = None,
+                              option_type: Optional[str] = None, moneyness: Optional[str] = None,
+                              expiry: Optional[str] = None):
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"layout must be one of: {', '.join(LAYOUTS)}")
+    option_type = option_type.lower() if option_type else None
+    moneyness = moneyness.lower() if moneyness else None
+    if option_type is not None and option_type not in OPTION_TYPES:
+        raise HTTPException(status_code=400, detail=f"option_type must be one of: {', '.join(OPTION_TYPES)}")
+    if moneyness is not None and moneyness not in MONEYNESS:
+        raise HTTPException(status_code=400, detail=f"moneyness must be one of: {', '.join(MONEYNESS)}")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="limit and offset must not be negative")
+    if max_expiries is not None and max_expiries < 1:
+        raise HTTPException(status_code=400, detail="max_expiries must be at least 1")
+    if window is not None and window < 1:
+        raise HTTPException(status_code=400, detail="window must be at least 1")
+    selection = {
+        'offset': offset,
+        'limit': limit,
+        'option_type': option_type,
+        'min_ratio': min_ratio,
+        'moneyness': moneyness,
+        'expiry': expiry
+    }
+    
     try:
         ticker = ticker.upper()
         logger.info(f"Request for options activity for {ticker}")
         
-        unusual_options = get_unusual_options(ticker)
-        
-        if unusual_options:
-            current_price = unusual_options[0]['current_stock_price']
+        if delta:
+            activity = await get_delta_activity(ticker, window, **selection)
+        elif term_structure:
+            activity = await get_term_structure_activity(ticker, max_expiries, **selection)
         else:
+            activity = await get_options_activity(ticker, **selection)
+        
+        current_price = activity['current_price']
+        if current_price is None:
             # Try to get current price
             try:
-                cached_data = cache.get_ticker_data(ticker)
-                if cached_data:
-                    current_price = cached_data['price']
-                else:
-                    stock = get_ticker_with_backoff(ticker)
-                    rate_limited_request()
-                    current_price = stock.info.get('regularMarketPrice')
-                    if not current_price:
-                        rate_limited_request()
-                        current_price = stock.history(period="1d")['Close'].iloc[-1]
-                    
-                    # Cache the price
-                    cache.set_ticker_data(ticker, current_price)
+                current_price = await get_current_price(ticker)
             except Exception as e:
                 logger.error(f"Error getting price for {ticker}: {str(e)}")
                 current_price = None
         
-        calls = [opt for opt in unusual_options if opt['option_type'].lower() == 'call']
-        puts = [opt for opt in unusual_options if opt['option_type'].lower() == 'put']
-        
-        calls_volume = sum(opt['current_volume'] for opt in calls)
-        puts_volume = sum(opt['current_volume'] for opt in puts)
-        total_volume = calls_volume + puts_volume
-        
-        return {
+        body = dumps_with({
             'ticker': ticker,
             'date': datetime.now().strftime('%Y-%m-%d'),
+            **activity,
             'current_price': current_price,
-            'has_unusual_activity': len(unusual_options) > 0,
-            'options_activity': unusual_options,
-            'calls_volume': calls_volume,
-            'puts_volume': puts_volume,
-            'calls_percentage': (calls_volume / total_volume * 100) if total_volume > 0 else 0,
-            'puts_percentage': (puts_volume / total_volume * 100) if total_volume > 0 else 0
-        }
+            'has_unusual_activity': activity['total'] > 0
+        }, {'options_activity': encode_records(activity['options_activity'], layout, OPTION_RECORD_FIELDS)})
+        return encoded_response(body, request.headers.get('accept-encoding'), RESPONSE_COMPRESS_MIN_BYTES)
     except Exception as e:
         logger.error(f"Error getting ticker activity for {ticker}: {str(e)}")
         return {
@@ -761,7 +1988,10 @@ async def get_ticker_activity(ticker: str):
             'date': datetime.now().strftime('%Y-%m-%d'),
             'current_price': None,
             'has_unusual_activity': False,
-            'options_activity': [],
+            'options_activity': to_layout([], layout, OPTION_RECORD_FIELDS),
+            'total': 0,
+            'offset': offset,
+            'limit': limit,
             'calls_volume': 0,
             'puts_volume': 0,
             'calls_percentage': 0,
@@ -771,7 +2001,7 @@ async def get_ticker_activity(ticker: str):
 @app.post("/clear-cache")
 async def clear_cache():
     try:
-        cache.clear()
+        await cache.run_store(cache.clear)
         return {"message": "Cache cleared successfully"}
     except Exception as e:
         logger.error(f"Error clearing cache: {str(e)}")
@@ -779,11 +2009,12 @@ async def clear_cache():
 
 @app.get("/bullish-bearish")
 async def get_bullish_bearish():
-    """Get bullish-bearish breakdown from cached data"""
+    """Get bullish-bearish breakdown from the latest market scan"""
     try:
-        # This is a simplified implementation that looks at cached unusualness scores
-        # For a real implementation, you would scan many tickers
-        cached_scores = cache.memory_cache['unusualness_scores']
+        # Prefer the scanner's complete snapshot; without one, fall back to
+        # whatever unusualness scores users have pulled into the cache
+        snapshot = await cache.get_market_snapshot()
+        cached_scores = snapshot['scores'] if snapshot else dict(cache.memory_cache['unusualness_scores'])
         
         if not cached_scores:
             return {
@@ -832,7 +2063,8 @@ async def get_bullish_bearish():
                 'calls_percentage': 50,
                 'puts_percentage': 50,
                 'bullish_tickers': bullish_tickers,
-                'bearish_tickers': bearish_tickers
+                'bearish_tickers': bearish_tickers,
+                'as_of': snapshot['as_of'] if snapshot else None
             }
         
         return {
@@ -842,7 +2074,8 @@ async def get_bullish_bearish():
             'calls_percentage': (bull_count / total * 100) if total > 0 else 0,
             'puts_percentage': (bear_count / total * 100) if total > 0 else 0,
             'bullish_tickers': bullish_tickers,
-            'bearish_tickers': bearish_tickers
+            'bearish_tickers': bearish_tickers,
+            'as_of': snapshot['as_of'] if snapshot else None
         }
     except Exception as e:
         logger.error(f"Error getting bullish-bearish breakdown: {str(e)}")
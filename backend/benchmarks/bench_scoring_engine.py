@@ -0,0 +1,41 @@
+"""Time the batch scoring engine against calculate_unusualness_score.
+
+Equivalence of the two is checked by tests/test_scoring_engine.py. Run
+from the backend directory:
+
+    python -m benchmarks.bench_scoring_engine
+"""
+import time
+
+from app import calculate_unusualness_score
+from benchmarks.fixtures import synthetic_options_data
+from cache_store import compact_chain
+from scoring_engine import LEGS, score_many
+
+# (tickers, contracts per side) for the timing runs
+SIZES = [(50, 100), (200, 100), (500, 100), (100, 2_000)]
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def compact(options_data):
+    """Options data as served from the cache: float32 chains sorted by strike"""
+    return {**options_data, **{leg: compact_chain(options_data[leg]) for leg in LEGS}, 'strikes_sorted': True}
+
+def main():
+    print(f"{'tickers':>8} {'contracts/side':>15} {'chains':>8} {'per-ticker ms':>14} {'engine ms':>10} {'speedup':>8}")
+    for n_tickers, n_contracts in SIZES:
+        raw = {f"T{i:04d}": synthetic_options_data(n_contracts, 50.0 + i, seed=i) for i in range(n_tickers)}
+        for label, batch in (('raw', raw), ('compact', {ticker: compact(data) for ticker, data in raw.items()})):
+            loop_time = best_of(lambda: [calculate_unusualness_score(data) for data in batch.values()], 3)
+            engine_time = best_of(lambda: score_many(batch), 3)
+            print(f"{n_tickers:>8,} {n_contracts:>15,} {label:>8} {loop_time * 1000:>14.1f} "
+                  f"{engine_time * 1000:>10.1f} {loop_time / engine_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the vectorized find_unusual_options against the old iterrows loop.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_unusual_options
+"""
+import time
+from datetime import datetime
+
+from app import find_unusual_options
+from benchmarks.fixtures import synthetic_options_data
+
+SIZES = [100, 1_000, 5_000, 20_000]
+
+def iterrows_unusual_options(ticker, options_data):
+    """The previous row-by-row implementation, kept as the reference"""
+    current_price = options_data['current_price']
+    nearest_date = options_data['nearest_date']
+    unusual_options = []
+
+    for option_type, chain in (('call', options_data['calls_near']), ('put', options_data['puts_near'])):
+        for idx, row in chain.iterrows():
+            if row['volume'] > 10 and row['openInterest'] > 0:
+                vol_oi_ratio = min(row['volume'] / row['openInterest'], 20) if row['openInterest'] > 10 else 0
+
+                if vol_oi_ratio >= 2:
+                    expiry_date = datetime.strptime(nearest_date, '%Y-%m-%d').date()
+                    days_to_expiry = (expiry_date - datetime.now().date()).days
+                    in_the_money = (float(row['strike']) < current_price if option_type == 'call'
+                                    else float(row['strike']) > current_price)
+
+                    unusual_options.append({
+                        'underlying_ticker': ticker,
+                        'option_symbol': f"{ticker}{'C' if option_type == 'call' else 'P'}{int(row['strike']*100)}",
+                        'option_type': option_type,
+                        'strike_price': float(row['strike']),
+                        'expiration_date': nearest_date,
+                        'days_to_expiry': days_to_expiry,
+                        'current_volume': int(row['volume']),
+                        'open_interest': int(row['openInterest']),
+                        'implied_volatility': round(float(row['impliedVolatility']) * 100, 2),
+                        'volume_ratio': round(vol_oi_ratio, 2),
+                        'in_the_money': in_the_money,
+                        'current_stock_price': float(current_price),
+                        'last_price': round(float(row['lastPrice']), 2)
+                    })
+
+    unusual_options.sort(key=lambda x: x['volume_ratio'], reverse=True)
+    return unusual_options
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    print(f"{'contracts/side':>15} {'rows out':>9} {'iterrows ms':>12} {'vectorized ms':>14} {'speedup':>8}")
+    for size in SIZES:
+        options_data = synthetic_options_data(size, seed=size)
+        expected = iterrows_unusual_options('SYN', options_data)
+        actual = find_unusual_options('SYN', options_data)
+        assert actual == expected, f"vectorized output differs from iterrows at {size} contracts"
+
+        repeat = 3 if size >= 5_000 else 10
+        loop_time = best_of(lambda: iterrows_unusual_options('SYN', options_data), repeat)
+        vector_time = best_of(lambda: find_unusual_options('SYN', options_data), repeat)
+        print(f"{size:>15,} {len(actual):>9,} {loop_time * 1000:>12.2f} {vector_time * 1000:>14.2f} "
+              f"{loop_time / vector_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
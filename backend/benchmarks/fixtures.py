@@ -0,0 +1,126 @@
+"""Synthetic option-chain fixtures shaped like yfinance output"""
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_sources import DataProvider, TickerSource
+from market_calendar import last_close
+
+def synthetic_chain(n_contracts, current_price=100.0, option_type='call', seed=0):
+    """Build a chain DataFrame with the columns of stock.option_chain(...).calls/puts"""
+    rng = np.random.default_rng(seed)
+    strikes = np.round(np.linspace(current_price * 0.5, current_price * 1.5, n_contracts), 2)
+    moneyness = (strikes - current_price) / current_price
+    if option_type == 'put':
+        moneyness = -moneyness
+
+    # Heavy-tailed volume and OI, with the gaps yfinance leaves for illiquid strikes
+    volume = np.floor(rng.lognormal(3, 2, n_contracts))
+    volume[rng.random(n_contracts) < 0.1] = np.nan
+    open_interest = np.floor(rng.lognormal(4, 2, n_contracts))
+    open_interest[rng.random(n_contracts) < 0.05] = np.nan
+
+    last_price = np.maximum(-moneyness * current_price, 0) + rng.uniform(0.05, 5, n_contracts)
+    spread = rng.uniform(0.01, 0.2, n_contracts)
+    code = 'C' if option_type == 'call' else 'P'
+    trade_times = pd.Timestamp('2024-06-03 15:59', tz='UTC') - pd.to_timedelta(
+        rng.integers(0, 3 * 24 * 3600, n_contracts), unit='s')
+
+    return pd.DataFrame({
+        'contractSymbol': [f"SYN240621{code}{int(s * 1000):08d}" for s in strikes],
+        'lastTradeDate': trade_times,
+        'strike': strikes,
+        'lastPrice': np.round(last_price, 2),
+        'bid': np.round(last_price - spread, 2),
+        'ask': np.round(last_price + spread, 2),
+        'change': np.round(rng.normal(0, 0.5, n_contracts), 2),
+        'percentChange': np.round(rng.normal(0, 10, n_contracts), 2),
+        'volume': volume,
+        'openInterest': open_interest,
+        'impliedVolatility': np.abs(0.25 + 0.4 * moneyness ** 2 + rng.normal(0, 0.03, n_contracts)),
+        'inTheMoney': moneyness < 0,
+        'contractSize': 'REGULAR',
+        'currency': 'USD'
+    })
+
+# Sessions in each history period the app requests
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 21, '60d': 41, '3mo': 63, '6mo': 126}
+
+def synthetic_history(current_price=100.0, days=41, seed=0, end='2024-06-03'):
+    """Build a daily history frame like stock.history(period="60d")"""
+    rng = np.random.default_rng(seed)
+    # Random walk that ends at current_price
+    returns = rng.normal(0, 0.015, days)
+    closes = current_price * np.exp(np.cumsum(returns) - returns.sum())
+    index = pd.bdate_range(end=end, periods=days, tz='America/New_York', name='Date')
+    return pd.DataFrame({
+        'Open': closes,
+        'High': closes * 1.01,
+        'Low': closes * 0.99,
+        'Close': closes,
+        'Volume': rng.integers(1_000_000, 50_000_000, days),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0
+    }, index=index)
+
+def synthetic_options_data(n_contracts, current_price=100.0, seed=0):
+    """Build an options_data dict as produced by fetch_options_data"""
+    today = datetime.now().date()
+    nearest_date = (today + timedelta(days=3)).isoformat()
+    target_date = (today + timedelta(days=31)).isoformat()
+    return {
+        'calls_near': synthetic_chain(n_contracts, current_price, 'call', seed),
+        'puts_near': synthetic_chain(n_contracts, current_price, 'put', seed + 1),
+        'calls_target': synthetic_chain(n_contracts, current_price, 'call', seed + 2),
+        'puts_target': synthetic_chain(n_contracts, current_price, 'put', seed + 3),
+        'current_price': current_price,
+        'historical_data': synthetic_history(current_price, seed=seed),
+        'nearest_date': nearest_date,
+        'target_date': target_date
+    }
+
+class FixtureSource(TickerSource):
+    """Synthetic data for one ticker, seeded from the ticker and expiry.
+
+    Expiries sit 2, 9, 30 and 60 days out, like a weekly-listed name, and
+    each expiry's chain has n_contracts strikes per side. Repeated fetches
+    return identical frames.
+    """
+
+    def __init__(self, ticker, n_contracts=500, current_price=100.0):
+        self.ticker = ticker.upper()
+        self.n_contracts = n_contracts
+        self.current_price = current_price
+        self._seed = zlib.crc32(self.ticker.encode())
+
+    def expirations(self):
+        today = datetime.now().date()
+        return tuple((today + timedelta(days=days)).isoformat() for days in (2, 9, 30, 60))
+
+    def option_chain(self, expiry):
+        seed = self._seed + zlib.crc32(expiry.encode())
+        return (synthetic_chain(self.n_contracts, self.current_price, 'call', seed),
+                synthetic_chain(self.n_contracts, self.current_price, 'put', seed + 1))
+
+    def history(self, period):
+        # Bars end at the latest close, so the price-history store sees a current series
+        return synthetic_history(self.current_price, days=PERIOD_DAYS.get(period, 41), seed=self._seed,
+                                 end=last_close().date().isoformat())
+
+    def quote(self):
+        return self.current_price
+
+class FixtureProvider(DataProvider):
+    """Offline provider serving synthetic chains of a fixed size, with no rate limit"""
+
+    name = 'fixture'
+    rate_limited = False
+
+    def __init__(self, n_contracts=500, current_price=100.0):
+        self.n_contracts = n_contracts
+        self.current_price = current_price
+
+    def ticker(self, symbol):
+        return FixtureSource(symbol, self.n_contracts, self.current_price)
@@ -0,0 +1,260 @@
+"""Offline benchmark suite with memory tracking and baseline comparison.
+
+Every benchmark runs against synthetic chains from benchmarks/fixtures.py;
+the endpoint benchmarks swap in FixtureProvider, a throwaway cache and a
+throwaway snapshot store, so nothing touches Yahoo or the real cache
+directory. With --replay they also
+run against snapshots recorded with DATA_PROVIDER=record.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite                    # compare against baseline.json
+    python -m benchmarks.suite --update-baseline  # record a new baseline
+    python -m benchmarks.suite --sizes small,medium
+    python -m benchmarks.suite --replay ./replay
+
+Each benchmark reports the best wall time over several runs and the peak
+traced allocation of one extra run under tracemalloc. Anything slower or
+bigger than the baseline by more than --tolerance is reported as a
+regression and the exit status is 1. Timings are machine dependent;
+refresh the baseline when moving to different hardware.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import app
+from app import EnhancedCache, calculate_unusualness_score, find_unusual_options
+from benchmarks.fixtures import FixtureProvider, synthetic_options_data
+from cache_store import compact_chain
+from data_sources import ReplayProvider
+from price_history import PriceHistoryStore
+from scoring_engine import LEGS, score_many
+from snapshot_store import SnapshotStore
+
+# Contracts per side of each expiry
+SIZES = {
+    'small': 50,
+    'medium': 500,
+    'huge': 5_000
+}
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.002
+MIN_PEAK_KB_DELTA = 64
+CACHE_TICKERS = 10
+ENGINE_TICKERS = 20
+REPLAY_TICKERS = 5
+
+def measure(func, setup=None, repeat=5):
+    """Best wall time of func over repeat runs plus the traced peak of one more"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_kb': round(peak / 1024, 1)}
+
+def bench_scoring(size, n_contracts, repeat):
+    options_data = synthetic_options_data(n_contracts, seed=n_contracts)
+    # Scored as served from the cache: float32 chains sorted by strike
+    compact_data = {**options_data, **{leg: compact_chain(options_data[leg]) for leg in LEGS}, 'strikes_sorted': True}
+    batch = {f"T{i:03d}": synthetic_options_data(n_contracts, 50.0 + i, seed=i) for i in range(ENGINE_TICKERS)}
+    return {
+        f"calculate_unusualness_score/{size}": measure(
+            lambda: calculate_unusualness_score(options_data), repeat=repeat),
+        f"calculate_unusualness_score compact/{size}": measure(
+            lambda: calculate_unusualness_score(compact_data), repeat=repeat),
+        f"find_unusual_options/{size}": measure(
+            lambda: find_unusual_options('SYN', options_data), repeat=repeat),
+        f"score_many_{ENGINE_TICKERS}/{size}": measure(lambda: score_many(batch), repeat=repeat)
+    }
+
+def bench_cache(size, n_contracts, repeat, workdir):
+    """Persist and reload CACHE_TICKERS options entries through the columnar store"""
+    cache_dir = os.path.join(workdir, f"cache-{size}")
+    entries = {f"T{i:03d}": synthetic_options_data(n_contracts, 50.0 + i, seed=i) for i in range(CACHE_TICKERS)}
+    writer = EnhancedCache(cache_dir=cache_dir)
+
+    def mark_dirty():
+        for ticker, options_data in entries.items():
+            writer.set_options_data(ticker, options_data)
+
+    async def read_all(reader):
+        for ticker in entries:
+            # Lazy loads only map the files; touch every column like scoring would
+            data = await reader.get_options_data(ticker)
+            for leg in ('calls_near', 'puts_near', 'calls_target', 'puts_target'):
+                data[leg].sum(numeric_only=True)
+
+    def load_all():
+        asyncio.run(read_all(EnhancedCache(cache_dir=cache_dir)))
+
+    results = {f"cache_save_{CACHE_TICKERS}/{size}": measure(writer._save_cache, setup=mark_dirty, repeat=repeat)}
+    results[f"cache_load_{CACHE_TICKERS}/{size}"] = measure(load_all, repeat=repeat)
+    return results
+
+def time_endpoints(label, tickers, repeat):
+    """Time score and activity endpoints, cold and warm, against app.data_provider"""
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app.app)
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, f"{path} returned {response.status_code}"
+
+    results = {}
+    for ticker in tickers:
+        suffix = label if len(tickers) == 1 else f"{label}:{ticker}"
+        for name, path in (('score', f'/unusualness-score/{ticker}'), ('ticker', f'/ticker/{ticker}'),
+                           ('ticker columns', f'/ticker/{ticker}?layout=columns'),
+                           ('ticker top 20', f'/ticker/{ticker}?limit=20')):
+            results[f"GET {name} cold/{suffix}"] = measure(partial(get, path), setup=app.cache.clear, repeat=repeat)
+            get(path)
+            results[f"GET {name} warm/{suffix}"] = measure(partial(get, path), repeat=repeat)
+    return results
+
+def bench_endpoints(size, n_contracts, repeat, workdir):
+    app.data_provider = FixtureProvider(n_contracts)
+    app.cache = EnhancedCache(cache_dir=os.path.join(workdir, f"app-cache-{size}"))
+    app.price_history = PriceHistoryStore(app.cache)
+    return time_endpoints(size, ['SYN'], repeat)
+
+def bench_replay(replay_dir, repeat, workdir):
+    """Time endpoints against recorded snapshots for the first few recorded tickers"""
+    provider = ReplayProvider(replay_dir)
+    tickers = sorted(provider.store.namespaces())[:REPLAY_TICKERS]
+    if not tickers:
+        raise SystemExit(f"No recordings found in {replay_dir}")
+    app.data_provider = provider
+    app.cache = EnhancedCache(cache_dir=os.path.join(workdir, "app-cache-replay"))
+    app.price_history = PriceHistoryStore(app.cache)
+    return time_endpoints('replay', tickers, repeat)
+
+def run(sizes, repeat, replay_dir=None):
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    original = (app.data_provider, app.cache, app.price_history, app.snapshot_store)
+    # Endpoint fetches append snapshots; keep them out of the real snapshot dir
+    app.snapshot_store = SnapshotStore(os.path.join(workdir, "snapshots"))
+    results = {}
+    try:
+        for size in sizes:
+            n_contracts = SIZES[size]
+            size_repeat = max(2, repeat // 3) if n_contracts >= 5_000 else repeat
+            print(f"Running {size} ({n_contracts:,} contracts/side)...", file=sys.stderr)
+            results.update(bench_scoring(size, n_contracts, size_repeat))
+            results.update(bench_cache(size, n_contracts, size_repeat, workdir))
+            results.update(bench_endpoints(size, n_contracts, size_repeat, workdir))
+        if replay_dir:
+            print(f"Running replay from {replay_dir}...", file=sys.stderr)
+            results.update(bench_replay(replay_dir, repeat, workdir))
+    finally:
+        app.data_provider, app.cache, app.price_history, app.snapshot_store = original
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__
+    }
+
+def compare(results, baseline, tolerance):
+    """Print a report and return the names of regressed benchmarks"""
+    regressions = []
+    print(f"{'benchmark':<38} {'ms':>10} {'base ms':>10} {'change':>8} {'peak KB':>10} {'base KB':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        ms = result['seconds'] * 1000
+        if base is None:
+            print(f"{name:<38} {ms:>10.2f} {'-':>10} {'new':>8} {result['peak_kb']:>10,.0f} {'-':>10} {'new':>8}")
+            continue
+
+        time_change = result['seconds'] / base['seconds'] - 1 if base['seconds'] else 0.0
+        peak_change = result['peak_kb'] / base['peak_kb'] - 1 if base['peak_kb'] else 0.0
+        slower = (time_change > tolerance and
+                  result['seconds'] - base['seconds'] > MIN_SECONDS_DELTA)
+        bigger = (peak_change > tolerance and
+                  result['peak_kb'] - base['peak_kb'] > MIN_PEAK_KB_DELTA)
+        flag = ' <- REGRESSION' if slower or bigger else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<38} {ms:>10.2f} {base['seconds'] * 1000:>10.2f} {time_change:>+8.0%} "
+              f"{result['peak_kb']:>10,.0f} {base['peak_kb']:>10,.0f} {peak_change:>+8.0%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default=','.join(SIZES), help="comma-separated subset of " + ', '.join(SIZES))
+    parser.add_argument('--repeat', type=int, default=7, help="timed runs per benchmark")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown/growth as a fraction of the baseline")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--replay', metavar='DIR', help="also time endpoints against recordings in DIR")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="write these results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(sorted(unknown))}")
+
+    # Per-request INFO logs would dominate the timings
+    logging.getLogger('app').setLevel(logging.WARNING)
+    results = run(sizes, args.repeat, args.replay)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+
+    if args.update_baseline:
+        # Keep entries for sizes that weren't run this time
+        merged = {**baseline.get('results', {}), **results}
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                'environment': environment(),
+                'results': {name: merged[name] for name in sorted(merged)}
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from strike_index import sort_chain
+
+META_FILE = "meta.json"
+
+# Chain columns the scorers and the unusual-options scan read, and the dtypes
+# cached chains are narrowed to. Volume and open interest stay floating point
+# because yfinance leaves them NaN for illiquid strikes; strike stays float64
+# because it is compared with prices and turned into option symbols.
+COMPACT_CHAIN_DTYPES = {
+    'strike': np.float64,
+    'volume': np.float32,
+    'openInterest': np.float32,
+    'lastPrice': np.float32,
+    'impliedVolatility': np.float32
+}
+
+def compact_chain(chain: pd.DataFrame) -> pd.DataFrame:
+    """Prune a yfinance option chain to COMPACT_CHAIN_DTYPES, sorted by strike.
+
+    Symbols, trade dates, bid/ask and the other display columns are
+    dropped, which cuts a chain's memory several-fold. Sorting lets
+    strike_index.StrikeIndex answer moneyness windows by binary search.
+    """
+    compact = pd.DataFrame({
+        name: pd.to_numeric(chain[name], errors='coerce').to_numpy(dtype=dtype)
+        for name, dtype in COMPACT_CHAIN_DTYPES.items() if name in chain.columns
+    })
+    return sort_chain(compact) if 'strike' in compact.columns else compact
+
+def widen(values: pd.Series) -> pd.Series:
+    """A compact chain's float32 column cast back to float64 for arithmetic.
+
+    pandas reductions keep float32, which would change results and leave
+    NumPy float32 scalars that aren't JSON serializable. Scoring widens only
+    the columns it reduces, so whole chains are never copied.
+    """
+    return values.astype(np.float64) if values.dtype == np.float32 else values
+
+def _entry_dirname(key: str) -> str:
+    # Keys and namespaces come from URL paths (recordings are namespaced by
+    # ticker), so escape anything that could escape the store's root
+    name = quote(key, safe='')
+    if name.startswith('.'):
+        name = '%2E' + name[1:]
+    return name
+
+def _encode_column(values: pd.Series) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Turn one column into a plain NumPy array plus the metadata needed to rebuild it"""
+    info = {'dtype': str(values.dtype)}
+
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        info['tz'] = str(values.dt.tz)
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        info['kind'] = 'datetime'
+        array = values.to_numpy(dtype='datetime64[ns]').view('int64')
+    elif pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        info['kind'] = 'numeric'
+        array = values.to_numpy()
+    else:
+        # Strings are stored as fixed-width unicode so the file stays mmap-able
+        info['kind'] = 'string'
+        nulls = values.isna().to_numpy()
+        if nulls.any():
+            info['nulls'] = np.flatnonzero(nulls).tolist()
+        array = values.astype(str).to_numpy(dtype=str)
+    return info, array
+
+def _decode_column(array: np.ndarray, info: Dict[str, Any]) -> pd.Series:
+    if info['kind'] == 'datetime':
+        values = pd.Series(np.asarray(array).view('datetime64[ns]'))
+        if 'tz' in info:
+            values = values.dt.tz_localize('UTC').dt.tz_convert(info['tz'])
+        return values
+    if info['kind'] == 'string':
+        values = pd.Series(np.asarray(array), dtype=object)
+        if info.get('nulls'):
+            values.iloc[info['nulls']] = None
+        return values
+    return pd.Series(np.asarray(array))
+
+def _to_json_value(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    return value
+
+def _json_default(value):
+    # NumPy scalars end up in cached dicts (prices, rounded score components)
+    if isinstance(value, np.generic):
+        return value.item()
+    # Datetimes nested inside cached dicts (e.g. a scan snapshot's scores) come
+    # back as ISO strings; only top-level fields round-trip as datetimes
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _from_json_value(value):
+    if isinstance(value, dict) and '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    return value
+
+def encode_entry(entry: Dict[str, Any]) -> Tuple[Dict[str, Any], List[np.ndarray]]:
+    """Split an entry into JSON-able metadata and the column arrays of its DataFrames.
+
+    Scalar fields go into meta['fields']; each DataFrame field gets a list of
+    column infos in meta['frames'], whose 'array' is an index into the
+    returned arrays.
+    """
+    meta = {'fields': {}, 'frames': {}}
+    arrays = []
+
+    def add(values):
+        info, array = _encode_column(values)
+        info['array'] = len(arrays)
+        arrays.append(array)
+        return info
+
+    for field, value in entry.items():
+        if isinstance(value, pd.DataFrame):
+            frame_meta = {'columns': []}
+            for column in value.columns:
+                info = add(value[column])
+                info['name'] = column
+                frame_meta['columns'].append(info)
+            if not isinstance(value.index, pd.RangeIndex):
+                index_info = add(value.index.to_series(index=None))
+                index_info['name'] = value.index.name
+                frame_meta['index'] = index_info
+            meta['frames'][field] = frame_meta
+        else:
+            meta['fields'][field] = _to_json_value(value)
+    return meta, arrays
+
+def decode_entry(meta: Dict[str, Any], load_array: Callable[[int], np.ndarray]) -> Dict[str, Any]:
+    """Rebuild an entry from encode_entry metadata, fetching arrays by index"""
+    entry = {field: _from_json_value(value) for field, value in meta['fields'].items()}
+    for field, frame_meta in meta['frames'].items():
+        columns = {info['name']: _decode_column(load_array(info['array']), info).array
+                   for info in frame_meta['columns']}
+        index = None
+        if 'index' in frame_meta:
+            index = pd.Index(_decode_column(load_array(frame_meta['index']['array']), frame_meta['index']),
+                             name=frame_meta['index']['name'])
+        # copy=False keeps each column as its own block over the loaded array;
+        # the default would consolidate same-dtype columns into a fresh copy
+        entry[field] = pd.DataFrame(columns, index=index,
+                                    columns=[info['name'] for info in frame_meta['columns']], copy=False)
+    return entry
+
+class ColumnarStore:
+    """Per-entry on-disk store for cache namespaces.
+
+    Each entry is a directory under <root>/<namespace>/<key>/ holding a
+    meta.json for scalar fields plus one .npy file per DataFrame column.
+    Entries are written to a temp directory and swapped in by rename, so a
+    save only touches the changed entry and readers never see half a write.
+    Columns are read back memory-mapped instead of being parsed, and the
+    rebuilt DataFrames wrap the mappings without copying them, so pages are
+    only read when a column is used. Such frames are read-only.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _namespace_dir(self, namespace: str) -> str:
+        return os.path.join(self.root, _entry_dirname(namespace))
+
+    def _entry_dir(self, namespace: str, key: str) -> str:
+        return os.path.join(self._namespace_dir(namespace), _entry_dirname(key))
+
+    def namespaces(self) -> Set[str]:
+        return {unquote(name) for name in os.listdir(self.root)
+                if os.path.isdir(os.path.join(self.root, name))}
+
+    def keys(self, namespace: str) -> Set[str]:
+        """List stored keys without reading any entry"""
+        ns_dir = self._namespace_dir(namespace)
+        if not os.path.isdir(ns_dir):
+            return set()
+        return {unquote(name) for name in os.listdir(ns_dir) if '.__' not in name}
+
+    def save(self, namespace: str, key: str, entry: Dict[str, Any]):
+        ns_dir = self._namespace_dir(namespace)
+        os.makedirs(ns_dir, exist_ok=True)
+        final_dir = self._entry_dir(namespace, key)
+        tmp_dir = f"{final_dir}.__tmp__{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+
+        try:
+            meta, arrays = encode_entry(entry)
+            for i, array in enumerate(arrays):
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), array, allow_pickle=False)
+
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump(meta, f, default=_json_default)
+
+            # Swap the new entry in; an interrupted swap leaves only a stale
+            # .__old__ dir behind, which keys() and load() ignore
+            old_dir = None
+            if os.path.exists(final_dir):
+                old_dir = f"{final_dir}.__old__{uuid.uuid4().hex}"
+                os.rename(final_dir, old_dir)
+            os.rename(tmp_dir, final_dir)
+            if old_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def load(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        entry_dir = self._entry_dir(namespace, key)
+        meta_file = os.path.join(entry_dir, META_FILE)
+        if not os.path.exists(meta_file):
+            return None
+
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+
+        def load_array(i):
+            return np.load(os.path.join(entry_dir, f"{i}.npy"), mmap_mode='r', allow_pickle=False)
+
+        return decode_entry(meta, load_array)
+
+    def prune(self, namespace: str, max_age: float) -> Set[str]:
+        """Delete entries not rewritten within max_age seconds, returning their keys"""
+        ns_dir = self._namespace_dir(namespace)
+        if not os.path.isdir(ns_dir):
+            return set()
+        cutoff = time.time() - max_age
+        pruned = set()
+        for name in os.listdir(ns_dir):
+            path = os.path.join(ns_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    if '.__' not in name:
+                        pruned.add(unquote(name))
+            except OSError:
+                continue  # removed concurrently
+        return pruned
+
+    def delete(self, namespace: str, key: str):
+        shutil.rmtree(self._entry_dir(namespace, key), ignore_errors=True)
+
+    def clear(self):
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+class SqliteStore:
+    """Cache entries in one SQLite database in WAL mode, shared by every worker on the host.
+
+    Same interface as ColumnarStore. Each entry is one row holding its
+    encode_entry metadata and its column arrays packed as consecutive .npy
+    blobs. WAL lets readers proceed while another process writes. Rows carry
+    an updated timestamp, so workers can tell whether their in-memory copy
+    is still current with one primary-key lookup.
+
+    The database also holds leases: named, expiring locks that let one
+    worker fetch a ticker or run the market scan while the others wait.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.root = path
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # sqlite3 connections can't be shared across threads; the event loop,
+        # flusher and executor threads each get their own
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, updated REAL NOT NULL,"
+            " meta TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (namespace, key))")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; every statement is its own short transaction
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def keys(self, namespace: str) -> Set[str]:
+        rows = self._conn().execute("SELECT key FROM entries WHERE namespace = ?", (namespace,))
+        return {key for key, in rows}
+
+    def namespaces(self) -> Set[str]:
+        return {namespace for namespace, in self._conn().execute("SELECT DISTINCT namespace FROM entries")}
+
+    def save(self, namespace: str, key: str, entry: Dict[str, Any]) -> float:
+        """Insert or replace an entry, returning its new updated timestamp"""
+        meta, arrays = encode_entry(entry)
+        buffer = io.BytesIO()
+        for array in arrays:
+            np.save(buffer, array, allow_pickle=False)
+        updated = time.time()
+        self._conn().execute(
+            "INSERT INTO entries (namespace, key, updated, meta, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET "
+            "updated = excluded.updated, meta = excluded.meta, data = excluded.data",
+            (namespace, key, updated, json.dumps(meta, default=_json_default), buffer.getvalue()))
+        return updated
+
+    def _decode(self, meta: str, data: bytes) -> Dict[str, Any]:
+        buffer = io.BytesIO(data)
+        meta = json.loads(meta)
+        arrays = []
+        while buffer.tell() < len(data):
+            arrays.append(np.load(buffer, allow_pickle=False))
+        return decode_entry(meta, arrays.__getitem__)
+
+    def load(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT meta, data FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return self._decode(*row) if row else None
+
+    def load_if_changed(self, namespace: str, key: str,
+                        known_updated: Optional[float]) -> Tuple[Optional[float], Optional[Dict[str, Any]]]:
+        """Check an entry against the version a caller already holds.
+
+        Returns (None, None) if the entry is gone, (updated, None) if it hasn't
+        changed since known_updated, and (updated, entry) otherwise.
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT updated FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        if row is None:
+            return None, None
+        if known_updated is not None and row[0] <= known_updated:
+            return row[0], None
+        row = conn.execute(
+            "SELECT updated, meta, data FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        if row is None:  # deleted between the two reads
+            return None, None
+        return row[0], self._decode(row[1], row[2])
+
+    def prune(self, namespace: str, max_age: float) -> Set[str]:
+        """Delete entries not rewritten within max_age seconds, returning their keys"""
+        cutoff = time.time() - max_age
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pruned = {key for key, in conn.execute(
+                "SELECT key FROM entries WHERE namespace = ? AND updated < ?", (namespace, cutoff))}
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND updated < ?", (namespace, cutoff))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return pruned
+
+    def delete(self, namespace: str, key: str):
+        self._conn().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease unless another owner holds an unexpired one"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.expires < ? OR leases.owner = excluded.owner",
+            (name, owner, now + ttl, now))
+        return cursor.rowcount == 1
+
+    def release_lease(self, name: str, owner: str):
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_active(self, name: str) -> bool:
+        row = self._conn().execute("SELECT expires FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] >= time.time()
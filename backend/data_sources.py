@@ -0,0 +1,254 @@
+import logging
+import random
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from cache_store import ColumnarStore
+
+logger = logging.getLogger(__name__)
+
+class SnapshotNotFound(LookupError):
+    """The replay directory has no recording for the requested data"""
+
+class TickerSource(ABC):
+    """Upstream data for one ticker, mirroring the parts of yf.Ticker the API uses.
+
+    Methods may block on I/O. A TickerSource is opened per fetch, so any
+    per-ticker state it keeps (yfinance caches expirations and quotes on the
+    Ticker object) never outlives one fetch.
+    """
+
+    @abstractmethod
+    def expirations(self) -> Tuple[str, ...]:
+        ...
+
+    @abstractmethod
+    def option_chain(self, expiry: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(calls, puts) for one expiry"""
+
+    @abstractmethod
+    def history(self, period: str) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def quote(self) -> Optional[float]:
+        """Latest market price, or None if unknown"""
+
+class DataProvider(ABC):
+    """A source of option chains, price history and quotes"""
+
+    name = 'base'
+    # Calls draw tokens from the upstream rate limiter
+    rate_limited = True
+    # Calls block on I/O and must run on the executor rather than the event loop
+    blocking = True
+
+    @abstractmethod
+    def ticker(self, symbol: str) -> TickerSource:
+        ...
+
+    def simulated_latency(self) -> float:
+        """Seconds to wait before each call; only replay providers add any"""
+        return 0.0
+
+    def describe(self) -> Dict[str, Any]:
+        return {'name': self.name, 'rate_limited': self.rate_limited}
+
+class YFinanceSource(TickerSource):
+    def __init__(self, stock):
+        # yf.Ticker is lazy, so creating it costs no upstream request
+        self.stock = stock
+
+    def expirations(self):
+        return self.stock.options
+
+    def option_chain(self, expiry):
+        # One request returns both sides
+        chain = self.stock.option_chain(expiry)
+        return chain.calls, chain.puts
+
+    def history(self, period):
+        return self.stock.history(period=period)
+
+    def quote(self):
+        return self.stock.info.get('regularMarketPrice')
+
+class YFinanceProvider(DataProvider):
+    """Live Yahoo Finance data through yfinance"""
+
+    name = 'yfinance'
+
+    def ticker(self, symbol):
+        return YFinanceSource(yf.Ticker(symbol))
+
+# Snapshot keys within a ticker's namespace of the replay store
+EXPIRATIONS_KEY = 'expirations'
+QUOTE_KEY = 'quote'
+
+def _chain_key(expiry: str) -> str:
+    return f"chain:{expiry}"
+
+def _history_key(period: str) -> str:
+    return f"history:{period}"
+
+class RecordingSource(TickerSource):
+    """Passes calls through to another source and saves every response"""
+
+    def __init__(self, source: TickerSource, symbol: str, store: ColumnarStore):
+        self.source = source
+        self.symbol = symbol
+        self.store = store
+
+    def _record(self, key, entry):
+        try:
+            self.store.save(self.symbol, key, entry)
+        except Exception as e:
+            logger.warning(f"Could not record {key} for {self.symbol}: {str(e)}")
+
+    def expirations(self):
+        expirations = self.source.expirations()
+        self._record(EXPIRATIONS_KEY, {'expirations': list(expirations)})
+        return expirations
+
+    def option_chain(self, expiry):
+        calls, puts = self.source.option_chain(expiry)
+        self._record(_chain_key(expiry), {'calls': calls, 'puts': puts})
+        return calls, puts
+
+    def history(self, period):
+        history = self.source.history(period)
+        self._record(_history_key(period), {'history': history})
+        return history
+
+    def quote(self):
+        price = self.source.quote()
+        self._record(QUOTE_KEY, {'price': price})
+        return price
+
+class RecordingProvider(DataProvider):
+    """Wraps a live provider and records its responses for ReplayProvider"""
+
+    name = 'record'
+
+    def __init__(self, provider: DataProvider, replay_dir: str):
+        self.provider = provider
+        self.store = ColumnarStore(replay_dir)
+        self.rate_limited = provider.rate_limited
+        self.blocking = provider.blocking
+
+    def ticker(self, symbol):
+        return RecordingSource(self.provider.ticker(symbol), symbol.upper(), self.store)
+
+    def describe(self):
+        return {**super().describe(), 'provider': self.provider.name, 'replay_dir': self.store.root}
+
+class ReplaySource(TickerSource):
+    def __init__(self, provider: 'ReplayProvider', symbol: str):
+        self.provider = provider
+        self.symbol = symbol
+
+    def _load(self, key):
+        return self.provider.snapshot(self.symbol, key)
+
+    def expirations(self):
+        return tuple(self._load(EXPIRATIONS_KEY)['expirations'])
+
+    def option_chain(self, expiry):
+        chain = self._load(_chain_key(expiry))
+        return chain['calls'], chain['puts']
+
+    def history(self, period):
+        try:
+            return self._load(_history_key(period))['history']
+        except SnapshotNotFound:
+            # Serve whichever history was recorded; a 1d request only wants the last bar
+            history = self._load(self.provider.any_history_key(self.symbol))['history']
+            return history.tail(1) if period == "1d" else history
+
+    def quote(self):
+        try:
+            return self._load(QUOTE_KEY)['price']
+        except SnapshotNotFound:
+            history = self.history("1d")
+            return float(history['Close'].iloc[-1]) if not history.empty else None
+
+class ReplayProvider(DataProvider):
+    """Serves snapshots recorded by RecordingProvider, with no network and no rate limit.
+
+    Each call waits latency seconds plus up to jitter seconds on the event
+    loop, approximating upstream round trips without tying up executor
+    threads. Snapshots are read from disk once and then served from memory.
+    Symbols without a recording are served from fallback_ticker when set,
+    so a handful of recordings can stand in for a whole universe. The
+    recorded symbols are listed once at startup, so memory is bounded by
+    the replay directory however many symbols are requested.
+    """
+
+    name = 'replay'
+    rate_limited = False
+    blocking = False
+
+    def __init__(self, replay_dir: str, latency: float = 0.0, jitter: float = 0.0,
+                 fallback_ticker: Optional[str] = None):
+        self.store = ColumnarStore(replay_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.fallback_ticker = fallback_ticker.upper() if fallback_ticker else None
+        self._snapshots = {}
+        self._recorded = frozenset(self.store.namespaces())
+        self._lock = threading.Lock()
+
+    def _resolve(self, symbol: str) -> str:
+        """The recorded symbol that serves symbol"""
+        if symbol in self._recorded:
+            return symbol
+        if self.fallback_ticker in self._recorded:
+            return self.fallback_ticker
+        raise SnapshotNotFound(f"No recording for {symbol}")
+
+    def snapshot(self, symbol: str, key: str) -> Dict[str, Any]:
+        symbol = self._resolve(symbol)
+        with self._lock:
+            if (symbol, key) not in self._snapshots:
+                self._snapshots[(symbol, key)] = self.store.load(symbol, key)
+            entry = self._snapshots[(symbol, key)]
+        if entry is None:
+            raise SnapshotNotFound(f"No recorded {key} for {symbol}")
+        return entry
+
+    def any_history_key(self, symbol: str) -> str:
+        keys = sorted(key for key in self.store.keys(self._resolve(symbol)) if key.startswith('history:'))
+        if not keys:
+            raise SnapshotNotFound(f"No recorded history for {symbol}")
+        return keys[0]
+
+    def ticker(self, symbol):
+        return ReplaySource(self, symbol.upper())
+
+    def simulated_latency(self):
+        return self.latency + random.random() * self.jitter
+
+    def describe(self):
+        return {
+            **super().describe(),
+            'replay_dir': self.store.root,
+            'latency_ms': round(self.latency * 1000, 1),
+            'jitter_ms': round(self.jitter * 1000, 1),
+            'fallback_ticker': self.fallback_ticker,
+            'recorded_tickers': len(self._recorded)
+        }
+
+def create_provider(name: str, replay_dir: str = "./replay", latency: float = 0.0, jitter: float = 0.0,
+                    fallback_ticker: Optional[str] = None) -> DataProvider:
+    """Build the provider selected by DATA_PROVIDER"""
+    if name == 'yfinance':
+        return YFinanceProvider()
+    if name == 'record':
+        return RecordingProvider(YFinanceProvider(), replay_dir)
+    if name == 'replay':
+        return ReplayProvider(replay_dir, latency, jitter, fallback_ticker)
+    raise ValueError(f"Unknown data provider {name!r}; expected yfinance, record or replay")
@@ -0,0 +1,133 @@
+"""Fast JSON encoding and compression for large API responses.
+
+FastAPI's default path runs every response through jsonable_encoder, which
+walks each value in Python before the stdlib encoder walks it again; for a
+/ticker response with a thousand contract records that walk is most of the
+request. Here orjson encodes the data directly when it is installed, with a
+stdlib fallback producing the same JSON.
+
+RecordList memoizes its own encodings, so a record list kept in a cache is
+encoded once per layout and spliced into each response as bytes. Bodies
+above a size threshold are compressed with brotli when the client accepts
+it and the module is installed, otherwise gzip.
+"""
+import gzip
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+LAYOUTS = ('records', 'columns')
+DEFAULT_MIN_COMPRESS_BYTES = 1024
+# Fast levels: past these the size barely shrinks while the time keeps growing
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def _default(value):
+    # pandas Timestamps are datetime subclasses, which orjson doesn't serialize
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON. NaN and infinity become null, as orjson writes them."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    data = jsonable_encoder(data, custom_encoder={float: lambda value: value if math.isfinite(value) else None})
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+class RecordList(list):
+    """A list of flat records that memoizes its JSON encoding per layout.
+
+    Only valid while the list is not mutated, which holds for lists cached
+    as part of a derived summary.
+    """
+    __slots__ = ('fields', 'encodings')
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), fields: Sequence[str] = ()):
+        super().__init__(records)
+        self.fields = tuple(fields)
+        self.encodings: Dict[str, bytes] = {}
+
+    def encode(self, layout: str = 'records') -> bytes:
+        body = self.encodings.get(layout)
+        if body is None:
+            body = self.encodings[layout] = dumps(to_layout(self, layout, self.fields))
+        return body
+
+def to_columns(records: Sequence[Dict[str, Any]], fields: Sequence[str] = ()) -> Dict[str, list]:
+    """{field: [value per record]}; field names are sent once instead of once per record"""
+    fields = fields or (list(records[0]) if records else [])
+    return {field: [record[field] for record in records] for field in fields}
+
+def to_layout(records: Sequence[Dict[str, Any]], layout: str, fields: Sequence[str] = ()):
+    if layout == 'columns':
+        return to_columns(records, fields)
+    return records
+
+def encode_records(records: Sequence[Dict[str, Any]], layout: str = 'records', fields: Sequence[str] = ()) -> bytes:
+    """Encoded records in a layout, reusing a RecordList's memoized encoding"""
+    if isinstance(records, RecordList):
+        return records.encode(layout)
+    return dumps(to_layout(records, layout, fields))
+
+def dumps_with(data: Dict[str, Any], fragments: Dict[str, bytes]) -> bytes:
+    """Encode a dict with some of its values given as already-encoded JSON"""
+    body = dumps({key: value for key, value in data.items() if key not in fragments})
+    spliced = b','.join(dumps(key) + b':' + fragment for key, fragment in fragments.items())
+    if not spliced:
+        return body
+    return b'{' + spliced + (b',' + body[1:] if body != b'{}' else b'}')
+
+def accepted_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """'br' or 'gzip' when the Accept-Encoding header allows it, else None"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+def encoded_response(body: bytes, accept_encoding: Optional[str] = None,
+                     min_compress_bytes: int = DEFAULT_MIN_COMPRESS_BYTES, status_code: int = 200) -> Response:
+    """A JSON response for an encoded body, compressed when large and accepted"""
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = accepted_encoding(accept_encoding) if len(body) >= min_compress_bytes else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type='application/json')
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with dumps; usable as FastAPI's default_response_class"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
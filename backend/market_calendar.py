@@ -0,0 +1,165 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# NYSE regular session; US equity options trade the same hours
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+def _observed(day: date) -> date:
+    """Holidays on a Saturday are observed Friday, on a Sunday the following Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth given weekday of a month; n=-1 is the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1))
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+@lru_cache(maxsize=None)
+def exchange_holidays(year: int) -> frozenset:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(date(year, 7, 4)),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day falling on a Saturday is not observed on the prior Friday
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> frozenset:
+    candidates = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # day after Thanksgiving
+        date(year, 12, 24),
+    }
+    return frozenset(day for day in candidates if is_trading_day(day))
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in exchange_holidays(day.year)
+
+def session_bounds(day: date) -> Tuple[datetime, datetime]:
+    close = EARLY_CLOSE if day in early_closes(day.year) else SESSION_CLOSE
+    return (datetime.combine(day, SESSION_OPEN, EXCHANGE_TZ),
+            datetime.combine(day, close, EXCHANGE_TZ))
+
+def _to_exchange_time(moment: Optional[datetime]) -> datetime:
+    # Naive datetimes are local time, as produced by datetime.now() in the cache
+    return (moment or datetime.now()).astimezone(EXCHANGE_TZ)
+
+def is_market_open(moment: Optional[datetime] = None) -> bool:
+    moment = _to_exchange_time(moment)
+    if not is_trading_day(moment.date()):
+        return False
+    session_open, session_close = session_bounds(moment.date())
+    return session_open <= moment < session_close
+
+def next_open(moment: Optional[datetime] = None) -> datetime:
+    """The next session open strictly after moment, in exchange time"""
+    moment = _to_exchange_time(moment)
+    day = moment.date()
+    while True:
+        if is_trading_day(day):
+            session_open, _ = session_bounds(day)
+            if session_open > moment:
+                return session_open
+        day += timedelta(days=1)
+
+def next_close(moment: Optional[datetime] = None) -> datetime:
+    """The next session close strictly after moment, in exchange time"""
+    moment = _to_exchange_time(moment)
+    day = moment.date()
+    while True:
+        if is_trading_day(day):
+            _, session_close = session_bounds(day)
+            if session_close > moment:
+                return session_close
+        day += timedelta(days=1)
+
+def last_close(moment: Optional[datetime] = None) -> datetime:
+    """The most recent session close at or before moment, in exchange time"""
+    moment = _to_exchange_time(moment)
+    day = moment.date()
+    while True:
+        if is_trading_day(day):
+            _, session_close = session_bounds(day)
+            if session_close <= moment:
+                return session_close
+        day -= timedelta(days=1)
+
+def trading_days_between(start: date, end: date) -> int:
+    """Trading days after start up to and including end"""
+    days = 0
+    day = start + timedelta(days=1)
+    while day <= end:
+        days += is_trading_day(day)
+        day += timedelta(days=1)
+    return days
+
+class MarketHoursTTL:
+    """TTL policy driven by the exchange calendar.
+
+    Entries written during the session live for open_ttl seconds. Entries
+    written while the market is closed can't go stale until the next open,
+    so they stay valid until then, as do session entries whose TTL would
+    run past the close.
+    """
+
+    # Longest possible closed stretch (a holiday weekend) plus margin, for disk pruning
+    max_lifetime = 5 * 24 * 3600
+
+    def __init__(self, open_ttl: float):
+        self.open_ttl = open_ttl
+
+    def expires_at(self, timestamp: datetime) -> datetime:
+        moment = _to_exchange_time(timestamp)
+        if is_market_open(moment):
+            expiry = moment + timedelta(seconds=self.open_ttl)
+            # Don't expire an entry written near the close overnight or over a weekend
+            if expiry >= next_close(moment):
+                expiry = next_open(moment)
+        else:
+            expiry = next_open(moment)
+        # Hand back the same kind of datetime we were given
+        if timestamp.tzinfo is None:
+            return expiry.astimezone().replace(tzinfo=None)
+        return expiry
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'type': 'market_hours',
+            'open_ttl_seconds': self.open_ttl,
+            'closed': 'valid until next open'
+        }
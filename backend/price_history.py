@@ -0,0 +1,123 @@
+"""Rolling daily price history per ticker with precomputed realized volatility.
+
+Daily closes only change once per session, so the history is downloaded in
+full once and afterwards only the sessions missing since the last complete
+bar are requested. Realized volatility over each window is computed when a
+new session's close arrives and read back as a scalar by scoring.
+
+Entries live in the cache's price_history namespace, so they share its LRU
+memory budget, write-behind flusher and disk pruning, and with the shared
+cache backend every worker sees the same series.
+"""
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from market_calendar import EXCHANGE_TZ, is_market_open, last_close, trading_days_between
+
+logger = logging.getLogger(__name__)
+
+REALIZED_VOL_WINDOWS = (20, 30, 60)
+# Scoring has always accepted a history of 20 closes; shorter series fall back to it
+MIN_CLOSES = 20
+# Enough sessions for the longest window plus slack for holidays
+INITIAL_PERIOD = "6mo"
+KEEP_SESSIONS = 130
+# Smallest yfinance period covering a gap of up to n sessions
+GAP_PERIODS = ((1, "1d"), (5, "5d"), (21, "1mo"), (63, "3mo"))
+
+def realized_volatility(closes: pd.Series, window: int, min_closes: Optional[int] = None) -> Optional[float]:
+    """Annualized close-to-close volatility in percent over the last window returns.
+
+    With fewer than window + 1 closes every close is used, provided there
+    are at least min_closes of them.
+    """
+    if len(closes) < min(window + 1, min_closes or window + 1):
+        return None
+    returns = closes.iloc[-(window + 1):].pct_change().dropna()
+    return float(returns.std() * np.sqrt(252) * 100)
+
+def _session_dates(history: pd.DataFrame) -> np.ndarray:
+    index = history.index
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index = index.tz_convert(EXCHANGE_TZ)
+    return np.array([moment.date() for moment in index])
+
+class PriceHistoryStore:
+    def __init__(self, cache, windows=REALIZED_VOL_WINDOWS, keep_sessions=KEEP_SESSIONS):
+        self.cache = cache
+        self.windows = tuple(windows)
+        self.keep_sessions = keep_sessions
+        self.stats = {'full_downloads': 0, 'gap_downloads': 0, 'skipped_downloads': 0}
+
+    async def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """The stored entry: history, complete_through, realized_vol and timestamp"""
+        entry = await self.cache.get_price_history(ticker)
+        if entry is not None:
+            # Windows come back from disk as JSON string keys
+            entry['realized_vol'] = {int(window): vol for window, vol in entry['realized_vol'].items()}
+        return entry
+
+    def _is_current(self, entry: Dict[str, Any], moment: Optional[datetime] = None) -> bool:
+        return entry['complete_through'] >= last_close(moment).date().isoformat()
+
+    async def period_needed(self, ticker: str, moment: Optional[datetime] = None) -> Optional[str]:
+        """The history period to download, or None when the stored series is up to date.
+
+        While the market is open today's bar is still moving, so at least
+        one day is always requested for the live price.
+        """
+        period = await self._period_needed(ticker, moment)
+        key = 'skipped_downloads' if period is None else 'full_downloads' if period == INITIAL_PERIOD else 'gap_downloads'
+        self.stats[key] += 1
+        return period
+
+    async def _period_needed(self, ticker: str, moment: Optional[datetime] = None) -> Optional[str]:
+        entry = await self.get(ticker)
+        if entry is None or entry['history'].empty:
+            return INITIAL_PERIOD
+        open_now = is_market_open(moment)
+        if self._is_current(entry, moment) and not open_now:
+            return None
+        through = date.fromisoformat(entry['complete_through'])
+        today = (moment or datetime.now()).astimezone(EXCHANGE_TZ).date()
+        if (today - through).days > 100:
+            return INITIAL_PERIOD
+        gap = trading_days_between(through, today)
+        for sessions, period in GAP_PERIODS:
+            if gap <= sessions:
+                return period
+        return INITIAL_PERIOD
+
+    async def merge(self, ticker: str, bars: pd.DataFrame, moment: Optional[datetime] = None) -> Dict[str, Any]:
+        """Add downloaded bars to the series, replacing any bars for the same sessions"""
+        entry = await self.get(ticker)
+        frames = [frame for frame in (entry['history'] if entry is not None else None, bars)
+                  if frame is not None and not frame.empty]
+        history = pd.concat(frames) if len(frames) > 1 else (frames[0] if frames else bars)
+        if not history.empty:
+            sessions = _session_dates(history)
+            keep = ~pd.Series(sessions).duplicated(keep='last').to_numpy()
+            history = history[keep]
+            history = history.iloc[np.argsort(sessions[keep], kind='stable')].tail(self.keep_sessions)
+
+        # Bars up to the latest close are final; a bar for today's open session isn't
+        completed = last_close(moment).date()
+        sessions = _session_dates(history) if not history.empty else np.array([])
+        final = sessions <= completed
+        complete_through = max(sessions[final]).isoformat() if final.any() else date.min.isoformat()
+
+        realized_vol = entry['realized_vol'] if entry is not None else {}
+        if entry is None or complete_through != entry['complete_through'] or not realized_vol:
+            closes = history['Close'][final] if not history.empty else pd.Series(dtype=float)
+            realized_vol = {window: realized_volatility(closes, window, MIN_CLOSES) for window in self.windows}
+
+        # Persisted by the cache's flusher like any other entry
+        return self.cache.set_price_history(ticker, {
+            'history': history,
+            'complete_through': complete_through,
+            'realized_vol': realized_vol
+        })
@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; shared state is POSIX-only
+    fcntl = None
+
+# Whether limiter state can be shared between processes through a state file
+SHARED_STATE_SUPPORTED = fcntl is not None
+
+# Priority lanes, lowest value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_RETRY = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_RETRY: 'retry',
+    PRIORITY_BACKGROUND: 'background'
+}
+
+class TokenBucketLimiter:
+    """Token-bucket limiter for upstream requests with priority lanes.
+
+    Tokens refill continuously at rate_per_minute up to capacity, so short
+    bursts go straight through while the sustained rate stays bounded.
+    Waiters are granted tokens strictly in (priority, arrival) order.
+
+    When state_file is given, the bucket lives in that file and every token
+    is taken under an exclusive flock, so all uvicorn workers on the host
+    draw from one shared budget. The locked read-modify-write runs on the
+    default executor, so a worker waiting on the lock never blocks its loop.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int, state_file: Optional[str] = None):
+        if rate_per_minute <= 0 or capacity < 1:
+            raise ValueError("rate_per_minute must be positive and capacity at least 1")
+        if state_file and fcntl is None:
+            raise RuntimeError("Shared limiter state requires fcntl (POSIX only)")
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = capacity
+        self.state_file = state_file
+        self._tokens = float(capacity)
+        self._updated = time.time()
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._dispatcher = None
+        self.granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.total_wait_seconds = 0.0
+
+        if state_file:
+            os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _read_state(self, f) -> Dict[str, float]:
+        f.seek(0)
+        try:
+            state = json.loads(f.read() or '{}')
+            return {'tokens': float(state['tokens']), 'updated': float(state['updated'])}
+        except (ValueError, KeyError, TypeError):
+            return {'tokens': float(self.capacity), 'updated': time.time()}
+
+    def _write_state(self, f, tokens: float, updated: float):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps({'tokens': tokens, 'updated': updated}))
+        f.flush()
+
+    def _take_shared(self) -> float:
+        """Take a token from the state file under its exclusive lock; blocks, so it runs on an executor"""
+        now = time.time()
+        with open(self.state_file, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                state = self._read_state(f)
+                tokens = self._refill(state['tokens'], state['updated'], now)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if wait == 0.0:
+                    tokens -= 1
+                self._write_state(f, tokens, now)
+                self._tokens, self._updated = tokens, now
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    async def _try_take(self) -> float:
+        """Take one token if available. Returns 0 on success, else seconds until one refills."""
+        if self.state_file:
+            return await asyncio.get_running_loop().run_in_executor(None, self._take_shared)
+
+        now = time.time()
+        self._tokens = self._refill(self._tokens, self._updated, now)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """The first waiter in (priority, arrival) order, dropping ones cancelled while queued"""
+        while self._waiters:
+            future = self._waiters[0][2]
+            if not future.done():
+                return future
+            heapq.heappop(self._waiters)
+        return None
+
+    async def _dispatch(self):
+        while self._next_waiter() is not None:
+            wait = await self._try_take()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            # Waiters may have queued while the token was taken; it goes to the first
+            future = self._next_waiter()
+            if future is None:
+                if not self.state_file:
+                    self._tokens += 1  # everyone cancelled, so hand the token back
+                return
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Wait for a token in the given lane. Returns the seconds spent waiting."""
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+        waited = time.monotonic() - started
+        self.granted[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        self.total_wait_seconds += waited
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        tokens, updated = self._tokens, self._updated
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                # Don't wait on a worker mid-take; the last state this one saw will do
+                try:
+                    fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                except OSError:
+                    state = None
+                else:
+                    try:
+                        state = self._read_state(f)
+                    finally:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+            if state is not None:
+                tokens, updated = state['tokens'], state['updated']
+
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES.get(priority, str(priority))] += 1
+
+        return {
+            'tokens': round(self._refill(tokens, updated, time.time()), 2),
+            'capacity': self.capacity,
+            'rate_per_minute': round(self.rate * 60, 2),
+            'shared_state_file': self.state_file,
+            'queue_depth': sum(queued.values()),
+            'queued_by_lane': queued,
+            'granted_by_lane': dict(self.granted),
+            'total_wait_seconds': round(self.total_wait_seconds, 2)
+        }
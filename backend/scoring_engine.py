@@ -0,0 +1,234 @@
+"""Vectorized unusualness scoring for many tickers at once.
+
+calculate_unusualness_score() in app.py scores one options_data dict with a
+dozen small pandas filters. This engine takes every ticker's four chain legs
+stacked into one long-format frame and computes all components with
+segmented NumPy reductions (one bincount per statistic), so the per-ticker
+cost is a few array slots instead of a pandas call chain.
+
+The arithmetic mirrors calculate_unusualness_score step for step, including
+its NaN behaviour and Python min() semantics, so both produce the same
+scores and components.
+"""
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strike_index import ATM_HIGH, ATM_LOW, OTM_CALL_ABOVE, OTM_PUT_BELOW
+
+logger = logging.getLogger(__name__)
+
+# Segment order within a ticker; the near legs feed the IV and skew components
+LEGS = ('calls_near', 'puts_near', 'calls_target', 'puts_target')
+CALLS_NEAR, PUTS_NEAR, CALLS_TARGET, PUTS_TARGET = range(len(LEGS))
+CHAIN_COLUMNS = ('strike', 'volume', 'openInterest', 'lastPrice', 'impliedVolatility')
+
+def default_score_result() -> Dict[str, Any]:
+    """What calculate_unusualness_score returns when scoring fails"""
+    return {
+        'score': 1,
+        'components': {
+            'volume_oi_ratio': 0,
+            'put_call_ratio': 0,
+            'iv_vs_historical': 0,
+            'skew_analysis': 0
+        },
+        'raw_data': {
+            'avg_vol_oi': 0,
+            'pcr_near': 0,
+            'pcr_target': 0
+        }
+    }
+
+def historical_volatility(hist_data) -> Optional[float]:
+    """Annualized close-to-close volatility in percent, or None without 20 days of history"""
+    if not (isinstance(hist_data, pd.DataFrame) and 'Close' in hist_data.columns and len(hist_data) >= 20):
+        return None
+    returns = hist_data['Close'].pct_change().dropna()
+    return returns.std() * np.sqrt(252) * 100
+
+def options_hist_vol(options_data: Dict[str, Any]) -> Optional[float]:
+    """Realized vol for scoring: the hist_vol precomputed at fetch time, else computed from historical_data"""
+    if 'hist_vol' in options_data:
+        return options_data['hist_vol']
+    return historical_volatility(options_data['historical_data'])
+
+def stack_chains(options_by_ticker: Dict[str, Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Stack options_data dicts into the engine's input frames.
+
+    Returns a long-format chains frame (segment, CHAIN_COLUMNS), one row
+    per contract, and an underlyings frame indexed by ticker with
+    current_price, hist_vol and has_history. A row's segment is its
+    ticker's position in underlyings times len(LEGS) plus its leg's
+    position in LEGS. Tickers whose chains lack a required column are
+    left out.
+    """
+    segments, columns = [], {name: [] for name in CHAIN_COLUMNS}
+    underlyings = []
+
+    for ticker, options_data in options_by_ticker.items():
+        try:
+            arrays = [{name: options_data[leg][name].to_numpy(dtype=float) for name in CHAIN_COLUMNS}
+                      for leg in LEGS]
+            hist_vol = options_hist_vol(options_data)
+            current_price = float(options_data['current_price'])
+        except Exception as e:
+            logger.warning(f"Skipping {ticker} in batch scoring: {str(e)}")
+            continue
+
+        first_segment = len(underlyings) * len(LEGS)
+        for leg_code, leg_arrays in enumerate(arrays):
+            segments.append(np.full(len(leg_arrays['strike']), first_segment + leg_code, dtype=np.int32))
+            for name in CHAIN_COLUMNS:
+                columns[name].append(leg_arrays[name])
+        underlyings.append({
+            'ticker': ticker,
+            'current_price': current_price,
+            'hist_vol': np.nan if hist_vol is None else hist_vol,
+            'has_history': hist_vol is not None
+        })
+
+    def concat(parts, dtype):
+        return np.concatenate(parts) if parts else np.array([], dtype=dtype)
+
+    chains = pd.DataFrame({
+        'segment': concat(segments, np.int32),
+        **{name: concat(columns[name], float) for name in CHAIN_COLUMNS}
+    })
+    underlyings = pd.DataFrame(underlyings, columns=['ticker', 'current_price', 'hist_vol', 'has_history'])
+    return chains, underlyings.set_index('ticker')
+
+def _py_min(a, b):
+    """Elementwise min(a, b) with Python's rule: b only wins when b < a, so a NaN a survives"""
+    return np.where(b < a, b, a)
+
+def _segment_mean(values: np.ndarray, segments: np.ndarray, mask: np.ndarray, n_segments: int):
+    """Per-segment Series.mean() of values[mask] plus the masked row count.
+
+    Like pandas, NaN values are skipped and a segment without any valid
+    value has a NaN mean.
+    """
+    segments = segments[mask]
+    values = values[mask]
+    valid = ~np.isnan(values)
+    rows = np.bincount(segments, minlength=n_segments)
+    counts = np.bincount(segments, weights=valid, minlength=n_segments)
+    sums = np.bincount(segments, weights=np.where(valid, values, 0.0), minlength=n_segments)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return sums / counts, rows
+
+def score_chains(chains: pd.DataFrame, underlyings: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Score every ticker in a stacked chains frame.
+
+    chains and underlyings are shaped like the output of stack_chains().
+    Returns {ticker: {'score', 'components', 'raw_data'}} in the format of
+    calculate_unusualness_score.
+    """
+    n_tickers = len(underlyings)
+    n_segments = n_tickers * len(LEGS)
+    if n_tickers == 0:
+        return {}
+
+    segments = chains['segment'].to_numpy(dtype=np.int32)
+    codes, leg_codes = np.divmod(segments, len(LEGS))
+    column = {name: chains[name].to_numpy(dtype=float) for name in CHAIN_COLUMNS}
+    strike = column['strike']
+    volume = column['volume']
+    open_interest = column['openInterest']
+    implied_vol = column['impliedVolatility']
+
+    current_price = underlyings['current_price'].to_numpy(dtype=float)
+    hist_vol = underlyings['hist_vol'].to_numpy(dtype=float)
+    has_history = underlyings['has_history'].to_numpy(dtype=bool)
+    row_price = current_price[codes]
+
+    # Volume/OI: mean of capped ratios over contracts with OI > 10, 0 for an empty leg
+    liquid = open_interest > 10
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.minimum(volume / open_interest, 20)
+    ratio_means, liquid_rows = _segment_mean(ratios, segments, liquid, n_segments)
+    leg_vol_oi = np.where(liquid_rows == 0, 0.0, ratio_means).reshape(n_tickers, len(LEGS))
+    avg_vol_oi = leg_vol_oi.mean(axis=1)
+    vol_oi_score = _py_min(avg_vol_oi / 2, 2.0)
+
+    # Put/call premium ratio per expiry, 5.0 when there is no call premium
+    premium = volume * column['lastPrice']
+    leg_premium = np.bincount(segments, weights=np.where(np.isnan(premium), 0.0, premium),
+                              minlength=n_segments).reshape(n_tickers, len(LEGS))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pcr_near = np.where(leg_premium[:, CALLS_NEAR] == 0, 5.0,
+                            leg_premium[:, PUTS_NEAR] / leg_premium[:, CALLS_NEAR])
+        pcr_target = np.where(leg_premium[:, CALLS_TARGET] == 0, 5.0,
+                              leg_premium[:, PUTS_TARGET] / leg_premium[:, CALLS_TARGET])
+    pcr_score = _py_min(_py_min(np.abs(pcr_near - 0.7) * 1.5, 2.0) +
+                        _py_min(np.abs(pcr_target - 0.7) * 1.5, 2.0), 3.0)
+
+    near_calls = leg_codes == CALLS_NEAR
+    near_puts = leg_codes == PUTS_NEAR
+
+    # ATM implied vol (strikes within 5% of spot) against realized vol
+    atm = (strike >= row_price * ATM_LOW) & (strike <= row_price * ATM_HIGH)
+    atm_iv, atm_rows = _segment_mean(implied_vol, segments, atm & (near_calls | near_puts), n_segments)
+    atm_iv = atm_iv.reshape(n_tickers, len(LEGS))
+    atm_rows = atm_rows.reshape(n_tickers, len(LEGS))
+    has_atm = (atm_rows[:, CALLS_NEAR] > 0) & (atm_rows[:, PUTS_NEAR] > 0)
+    avg_iv = (atm_iv[:, CALLS_NEAR] + atm_iv[:, PUTS_NEAR]) / 2 * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        iv_hv_ratio = np.where(hist_vol > 0, avg_iv / hist_vol, 2.0)
+    iv_score = np.where(has_history & has_atm, _py_min(np.abs(iv_hv_ratio - 1.15) * 3, 3.0),
+                        np.where(has_history, 1.5, 1.0))
+
+    # Skew: OTM put IV (strikes < 90% of spot) over OTM call IV (> 110%)
+    otm = (near_calls & (strike > row_price * OTM_CALL_ABOVE)) | (near_puts & (strike < row_price * OTM_PUT_BELOW))
+    otm_iv, otm_rows = _segment_mean(implied_vol, segments, otm, n_segments)
+    otm_iv = otm_iv.reshape(n_tickers, len(LEGS))
+    otm_rows = otm_rows.reshape(n_tickers, len(LEGS))
+    call_iv, put_iv = otm_iv[:, CALLS_NEAR], otm_iv[:, PUTS_NEAR]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew_unusualness = _py_min(np.abs(put_iv / call_iv - 1.2) * 3, 2.0)
+    skew_score = np.where((otm_rows[:, CALLS_NEAR] == 0) | (otm_rows[:, PUTS_NEAR] == 0), 1.0,
+                          np.where(call_iv == 0, 3.0, skew_unusualness))
+
+    total_score = vol_oi_score + pcr_score + iv_score + skew_score
+    # A NaN total makes round() raise in the per-ticker function, which then
+    # falls back to the default result
+    scored = ~np.isnan(total_score)
+    scaled_score = np.clip(np.round(np.where(scored, total_score, 0.0)), 1, 10).astype(int)
+
+    rows = zip(
+        underlyings.index, scored.tolist(), scaled_score.tolist(),
+        np.round(vol_oi_score, 2).tolist(), np.round(pcr_score, 2).tolist(),
+        np.round(iv_score, 2).tolist(), np.round(skew_score, 2).tolist(),
+        np.round(avg_vol_oi, 2).tolist(), np.round(pcr_near, 2).tolist(), np.round(pcr_target, 2).tolist()
+    )
+    results = {}
+    for ticker, ok, score, vol_oi, pcr, iv, skew, raw_vol_oi, raw_pcr_near, raw_pcr_target in rows:
+        if not ok:
+            results[ticker] = default_score_result()
+            continue
+        results[ticker] = {
+            'score': score,
+            'components': {
+                'volume_oi_ratio': vol_oi,
+                'put_call_ratio': pcr,
+                'iv_vs_historical': iv,
+                'skew_analysis': skew
+            },
+            'raw_data': {
+                'avg_vol_oi': raw_vol_oi,
+                'pcr_near': raw_pcr_near,
+                'pcr_target': raw_pcr_target
+            }
+        }
+    return results
+
+def score_many(options_by_ticker: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Score a {ticker: options_data} mapping in one pass.
+
+    Tickers that can't be stacked are missing from the result, so callers
+    can fall back to the per-ticker function for them.
+    """
+    chains, underlyings = stack_chains(options_by_ticker)
+    return score_chains(chains, underlyings)
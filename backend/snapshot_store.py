@@ -0,0 +1,189 @@
+"""Append-only store of intraday option-chain snapshots.
+
+Every options fetch appends the per-contract volume, open interest, IV
+and last price of each expiry it fetched. Partitions are keyed by ticker,
+trading day and expiry:
+
+    <root>/<TICKER>/<YYYY-MM-DD>/<expiry>/
+        index.bin      one INDEX_DTYPE record per snapshot
+        <column>.bin   raw little-endian values, one per contract row
+
+Rows are appended to the column files first and the index record last, so
+a reader (or a crash mid-append) never sees part of a snapshot: rows past
+the last indexed offset are ignored and truncated by the next append.
+Reads memory-map the files, so a last-N query touches only the rows of the
+snapshots it returns.
+
+Days are exchange (New York) dates because Yahoo's volume is cumulative for
+the session and resets at the open; deltas are only taken within a day.
+"""
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+
+from cache_store import _entry_dirname
+from market_calendar import EXCHANGE_TZ
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; appends are then only safe within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_DTYPE = np.dtype([('timestamp', '<i8'), ('offset', '<i8'), ('rows', '<i8')])
+SNAPSHOT_COLUMNS = {
+    'side': np.dtype('i1'),  # 0 call, 1 put
+    'strike': np.dtype('<f8'),
+    'volume': np.dtype('<f4'),
+    'openInterest': np.dtype('<f4'),
+    'impliedVolatility': np.dtype('<f4'),
+    'lastPrice': np.dtype('<f4')
+}
+CALL, PUT = 0, 1
+INDEX_FILE = "index.bin"
+LOCK_FILE = ".lock"
+
+def _column_file(column: str) -> str:
+    return f"{column}.bin"
+
+def _memmap(path: str, dtype: np.dtype, count: Optional[int] = None) -> np.ndarray:
+    """Read-only view of the first count records of a raw file (all of it when None)"""
+    size = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    count = size if count is None else min(count, size)
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+def exchange_day(moment: datetime) -> date:
+    if moment.tzinfo is None:
+        moment = moment.astimezone()  # naive timestamps are local time
+    return moment.astimezone(EXCHANGE_TZ).date()
+
+def _chain_column(chain: pd.DataFrame, column: str, dtype: np.dtype) -> np.ndarray:
+    if column not in chain.columns:
+        return np.full(len(chain), np.nan, dtype=dtype)
+    return pd.to_numeric(chain[column], errors='coerce').to_numpy(dtype=dtype)
+
+class SnapshotStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _partition(self, ticker: str, day: date, expiry: str) -> str:
+        return os.path.join(self.root, _entry_dirname(ticker.upper()), day.isoformat(), _entry_dirname(expiry))
+
+    def append(self, ticker: str, expiry: str, calls: pd.DataFrame, puts: pd.DataFrame,
+               timestamp: Optional[datetime] = None) -> int:
+        """Append one snapshot of an expiry's chain. Returns the number of contract rows."""
+        timestamp = timestamp or datetime.now()
+        columns = {'side': np.concatenate([np.full(len(calls), CALL, dtype='i1'),
+                                           np.full(len(puts), PUT, dtype='i1')])}
+        for column, dtype in SNAPSHOT_COLUMNS.items():
+            if column != 'side':
+                columns[column] = np.concatenate([_chain_column(calls, column, dtype),
+                                                  _chain_column(puts, column, dtype)])
+        rows = len(columns['side'])
+
+        partition = self._partition(ticker, exchange_day(timestamp), expiry)
+        os.makedirs(partition, exist_ok=True)
+        with self._lock, open(os.path.join(partition, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = _memmap(os.path.join(partition, INDEX_FILE), INDEX_DTYPE)
+                offset = int(index['offset'][-1] + index['rows'][-1]) if len(index) else 0
+                del index
+                for column, values in columns.items():
+                    with open(os.path.join(partition, _column_file(column)), 'ab') as f:
+                        # Drop rows of an append that died before its index record
+                        f.truncate(offset * values.dtype.itemsize)
+                        f.write(values.tobytes())
+                record = np.array([(pd.Timestamp(timestamp).value, offset, rows)], dtype=INDEX_DTYPE)
+                with open(os.path.join(partition, INDEX_FILE), 'ab') as f:
+                    f.write(record.tobytes())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        return rows
+
+    def index(self, ticker: str, expiry: str, day: Optional[date] = None) -> np.ndarray:
+        """INDEX_DTYPE records of a partition in append order (today's by default)"""
+        day = day or exchange_day(datetime.now())
+        return _memmap(os.path.join(self._partition(ticker, day, expiry), INDEX_FILE), INDEX_DTYPE)
+
+    def last(self, ticker: str, expiry: str, n: int, day: Optional[date] = None) -> List[Tuple[datetime, pd.DataFrame]]:
+        """The last n snapshots of an expiry within a day, oldest first, as (timestamp, chain)"""
+        day = day or exchange_day(datetime.now())
+        partition = self._partition(ticker, day, expiry)
+        index = self.index(ticker, expiry, day)[-n:] if n > 0 else []
+        if not len(index):
+            return []
+
+        end = int(index['offset'][-1] + index['rows'][-1])
+        columns = {column: _memmap(os.path.join(partition, _column_file(column)), dtype, end)
+                   for column, dtype in SNAPSHOT_COLUMNS.items()}
+        snapshots = []
+        for timestamp, offset, rows in index.tolist():
+            chain = pd.DataFrame({column: values[offset:offset + rows] for column, values in columns.items()},
+                                 copy=True)
+            snapshots.append((pd.Timestamp(timestamp).to_pydatetime(), chain))
+        return snapshots
+
+    def expiries(self, ticker: str, day: Optional[date] = None) -> List[str]:
+        day = day or exchange_day(datetime.now())
+        day_dir = os.path.dirname(self._partition(ticker, day, 'x'))
+        if not os.path.isdir(day_dir):
+            return []
+        return sorted(unquote(name) for name in os.listdir(day_dir))
+
+    def prune(self, keep_days: int) -> int:
+        """Delete day partitions older than keep_days. Returns the number removed."""
+        cutoff = (exchange_day(datetime.now()) - timedelta(days=keep_days)).isoformat()
+        removed = 0
+        for ticker in os.listdir(self.root):
+            ticker_dir = os.path.join(self.root, ticker)
+            if not os.path.isdir(ticker_dir):
+                continue
+            for day in os.listdir(ticker_dir):
+                if day < cutoff:
+                    shutil.rmtree(os.path.join(ticker_dir, day), ignore_errors=True)
+                    removed += 1
+        return removed
+
+def chain_delta(earlier: pd.DataFrame, later: pd.DataFrame) -> pd.DataFrame:
+    """Per-contract activity between two snapshots of the same expiry and day.
+
+    Returns the later snapshot's contracts with volume replaced by the
+    volume traded since the earlier one (contracts new in the later
+    snapshot count all of their volume) and the IV change alongside.
+    """
+    previous = earlier[['side', 'strike', 'volume', 'impliedVolatility']].drop_duplicates(['side', 'strike'])
+    merged = later.merge(previous, on=['side', 'strike'], how='left', suffixes=('', '_previous'))
+    volume = merged['volume'].astype(float)
+    # Volume is cumulative for the session, so it only grows; a lower
+    # reading is an upstream correction, not negative trading
+    traded = (volume - merged['volume_previous'].astype(float).fillna(0.0)).clip(lower=0.0)
+    return pd.DataFrame({
+        'side': merged['side'],
+        'strike': merged['strike'],
+        'volume': traded.where(volume.notna()),
+        'openInterest': merged['openInterest'].astype(float),
+        'lastPrice': merged['lastPrice'].astype(float),
+        'impliedVolatility': merged['impliedVolatility'].astype(float),
+        'iv_change': merged['impliedVolatility'].astype(float) - merged['impliedVolatility_previous'].astype(float)
+    })
+
+def split_sides(chain: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(calls, puts) of a snapshot or delta chain"""
+    side = chain['side'].to_numpy()
+    return (chain[side == CALL].reset_index(drop=True).drop(columns='side'),
+            chain[side == PUT].reset_index(drop=True).drop(columns='side'))
@@ -0,0 +1,75 @@
+"""Binary-search moneyness windows over a chain sorted by strike.
+
+Cached chains are stored sorted by strike (see compact_chain), so the rows
+inside any strike window are contiguous. StrikeIndex resolves a window to a
+slice with two searchsorted calls instead of a boolean scan over the chain,
+and the same index serves ATM, OTM-wing and moneyness-bucket queries.
+"""
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Moneyness windows as multiples of the underlying price: at the money within
+# 5%, and the out-of-the-money wings the skew compares beyond 10%
+ATM_LOW, ATM_HIGH = 0.95, 1.05
+OTM_CALL_ABOVE, OTM_PUT_BELOW = 1.1, 0.9
+
+def sort_chain(chain: pd.DataFrame) -> pd.DataFrame:
+    """Rows ordered by strike, contracts without a strike last"""
+    return chain.sort_values('strike', kind='stable', na_position='last', ignore_index=True)
+
+class StrikeIndex:
+    """Window queries over ascending strikes, with any NaN strikes at the end.
+
+    Windows use the same comparisons as the boolean masks they replace, and
+    NaN strikes or bounds never match, as with a mask.
+    """
+
+    def __init__(self, strikes: np.ndarray):
+        self.strikes = strikes
+        # NaN sorts last, so everything before the first NaN is a real strike
+        self.valid = int(np.searchsorted(strikes, np.inf, side='right'))
+
+    def _position(self, bound: float, side: str) -> int:
+        return min(int(np.searchsorted(self.strikes, bound, side=side)), self.valid)
+
+    def between(self, low: float, high: float) -> slice:
+        """Rows with low <= strike <= high"""
+        if np.isnan(low) or np.isnan(high):
+            return slice(0, 0)
+        start = self._position(low, 'left')
+        return slice(start, max(start, self._position(high, 'right')))
+
+    def above(self, bound: float) -> slice:
+        """Rows with strike > bound"""
+        if np.isnan(bound):
+            return slice(0, 0)
+        return slice(self._position(bound, 'right'), self.valid)
+
+    def below(self, bound: float) -> slice:
+        """Rows with strike < bound"""
+        if np.isnan(bound):
+            return slice(0, 0)
+        return slice(0, self._position(bound, 'left'))
+
+    def atm(self, price: float) -> slice:
+        return self.between(price * ATM_LOW, price * ATM_HIGH)
+
+    def otm_calls(self, price: float) -> slice:
+        """Rows in the out-of-the-money call wing"""
+        return self.above(price * OTM_CALL_ABOVE)
+
+    def otm_puts(self, price: float) -> slice:
+        """Rows in the out-of-the-money put wing"""
+        return self.below(price * OTM_PUT_BELOW)
+
+def strike_index(chain: pd.DataFrame, presorted: bool = False) -> Tuple[pd.DataFrame, StrikeIndex]:
+    """A chain sorted by strike plus its index; presorted chains are used as they are.
+
+    yfinance already lists strikes in ascending order, so an unmarked chain
+    is only copied when a check finds it out of order.
+    """
+    if not presorted and not chain['strike'].is_monotonic_increasing:
+        chain = sort_chain(chain)
+    return chain, StrikeIndex(chain['strike'].to_numpy(dtype=float))
@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from market_calendar import (
+    EARLY_CLOSE, EXCHANGE_TZ, SESSION_CLOSE, MarketHoursTTL, early_closes, exchange_holidays, is_trading_day,
+    session_bounds
+)
+
+@pytest.mark.parametrize("day", [
+    date(2024, 3, 29),  # Good Friday
+    date(2025, 4, 18),  # Good Friday
+    date(2026, 4, 3),  # Good Friday
+    date(2020, 7, 3),  # July 4 on a Saturday, observed Friday
+    date(2021, 7, 5),  # July 4 on a Sunday, observed Monday
+    date(2021, 12, 24),  # Christmas on a Saturday, observed Friday
+    date(2022, 12, 26),  # Christmas on a Sunday, observed Monday
+    date(2024, 11, 28),  # Thanksgiving
+])
+def test_holidays(day):
+    assert day in exchange_holidays(day.year)
+    assert not is_trading_day(day)
+
+@pytest.mark.parametrize("day", [
+    date(2020, 7, 6),  # the Monday after an observed Friday holiday
+    date(2021, 12, 31),  # New Year's Day on a Saturday isn't observed the Friday before
+    date(2022, 12, 23),  # the Friday before a Sunday Christmas
+    date(2025, 4, 21),  # Easter Monday
+])
+def test_trading_days_around_holidays(day):
+    assert is_trading_day(day)
+
+@pytest.mark.parametrize("day, close", [
+    (date(2024, 11, 29), EARLY_CLOSE),  # day after Thanksgiving
+    (date(2025, 11, 28), EARLY_CLOSE),  # day after Thanksgiving
+    (date(2024, 12, 24), EARLY_CLOSE),  # Christmas Eve
+    (date(2025, 12, 24), EARLY_CLOSE),  # Christmas Eve
+    (date(2024, 7, 3), EARLY_CLOSE),  # the day before Independence Day
+    (date(2024, 12, 23), SESSION_CLOSE),
+])
+def test_session_close(day, close):
+    _, session_close = session_bounds(day)
+    assert session_close.time() == close
+
+@pytest.mark.parametrize("day", [
+    date(2021, 12, 24),  # Christmas Eve that is itself the observed Christmas holiday
+    date(2026, 7, 3),  # July 3 that is the observed Independence Day
+    date(2022, 12, 24),  # Christmas Eve on a Saturday
+])
+def test_no_early_close_on_closed_days(day):
+    assert day not in early_closes(day.year)
+
+@pytest.mark.parametrize("written, expires", [
+    # Mid-session entries live for the open TTL
+    (datetime(2024, 6, 14, 11, 0), datetime(2024, 6, 14, 12, 0)),
+    # Near the close the TTL would run past it, so the entry spans the weekend
+    (datetime(2024, 6, 14, 15, 30), datetime(2024, 6, 17, 9, 30)),
+    # Written after an early close, valid until the next session
+    (datetime(2024, 11, 29, 13, 30), datetime(2024, 12, 2, 9, 30)),
+    # Written on a Saturday before a Monday holiday
+    (datetime(2024, 5, 25, 10, 0), datetime(2024, 5, 28, 9, 30)),
+])
+def test_market_hours_ttl(written, expires):
+    policy = MarketHoursTTL(3600)
+    expiry = policy.expires_at(written.replace(tzinfo=EXCHANGE_TZ))
+    assert expiry == expires.replace(tzinfo=EXCHANGE_TZ)
+
+def test_market_hours_ttl_keeps_naive_timestamps_naive():
+    written = datetime.now().replace(microsecond=0)
+    expiry = MarketHoursTTL(3600).expires_at(written)
+    assert expiry.tzinfo is None
+    assert expiry > written
+    assert expiry - written <= timedelta(seconds=MarketHoursTTL.max_lifetime)
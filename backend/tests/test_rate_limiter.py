@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_RETRY, SHARED_STATE_SUPPORTED, TokenBucketLimiter
+)
+
+# 600 per minute refills one token every 0.1 s
+RATE = 600
+
+def test_burst_is_served_without_waiting():
+    async def run():
+        limiter = TokenBucketLimiter(RATE, capacity=3)
+        return [await limiter.acquire() for _ in range(3)]
+
+    assert all(waited < 0.05 for waited in asyncio.run(run()))
+
+def test_interactive_is_served_before_queued_background():
+    async def run():
+        limiter = TokenBucketLimiter(RATE, capacity=1)
+        await limiter.acquire()  # drain the bucket so everything below queues
+        order = []
+
+        async def request(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        background = [asyncio.ensure_future(request(f"background-{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        retry = asyncio.ensure_future(request("retry", PRIORITY_RETRY))
+        interactive = asyncio.ensure_future(request("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(*background, retry, interactive)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["interactive", "retry", "background-0", "background-1", "background-2"]
+    assert stats['granted_by_lane'] == {'interactive': 2, 'retry': 1, 'background': 3}
+    assert stats['queue_depth'] == 0
+
+def test_cancelled_waiters_are_skipped():
+    async def run():
+        limiter = TokenBucketLimiter(RATE, capacity=1)
+        await limiter.acquire()
+        cancelled = asyncio.ensure_future(limiter.acquire(PRIORITY_INTERACTIVE))
+        waiting = asyncio.ensure_future(limiter.acquire(PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await asyncio.wait_for(waiting, 1)
+
+    assert asyncio.run(run()) < 0.5
+
+@pytest.mark.skipif(not SHARED_STATE_SUPPORTED, reason="shared limiter state needs fcntl")
+def test_shared_state_file_paces_all_limiters(tmp_path):
+    state_file = str(tmp_path / "limiter.json")
+
+    async def run():
+        # Two limiters over one file stand in for two workers
+        first = TokenBucketLimiter(RATE, capacity=2, state_file=state_file)
+        second = TokenBucketLimiter(RATE, capacity=2, state_file=state_file)
+        await first.acquire()
+        await first.acquire()
+        started = time.monotonic()
+        await second.acquire()
+        await second.acquire()
+        return time.monotonic() - started, second.stats()
+
+    waited, stats = asyncio.run(run())
+    # The first worker spent the shared burst, so the second is paced at the refill rate
+    assert waited >= 0.15
+    assert stats['tokens'] < 1
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from app import calculate_unusualness_score
+from benchmarks.fixtures import synthetic_options_data
+from cache_store import compact_chain
+from scoring_engine import LEGS, score_many
+
+RANDOM_CASES = 300
+
+def edge_cases():
+    """Options data that hits every fallback branch of the per-ticker scorer"""
+    cases = {}
+
+    data = synthetic_options_data(40, seed=1)
+    data['calls_near'] = data['calls_near'].iloc[0:0]
+    cases['EMPTY_CALLS'] = data
+
+    data = synthetic_options_data(40, seed=2)
+    data['calls_target']['volume'] = 0.0
+    cases['NO_CALL_PREMIUM'] = data
+
+    data = synthetic_options_data(40, seed=3)
+    data['puts_near']['volume'] = np.nan
+    cases['NAN_VOLUME'] = data
+
+    data = synthetic_options_data(40, seed=4)
+    data['historical_data'] = data['historical_data'].iloc[:10]
+    cases['SHORT_HISTORY'] = data
+
+    data = synthetic_options_data(40, seed=5)
+    data['historical_data'] = None
+    cases['NO_HISTORY'] = data
+
+    data = synthetic_options_data(40, seed=6)
+    data['historical_data']['Close'] = 100.0
+    cases['FLAT_HISTORY'] = data
+
+    data = synthetic_options_data(40, current_price=1000.0, seed=7)
+    data['current_price'] = 10.0
+    cases['NO_ATM_STRIKES'] = data
+
+    data = synthetic_options_data(40, seed=8)
+    data['calls_near']['impliedVolatility'] = 0.0
+    cases['ZERO_CALL_IV'] = data
+
+    data = synthetic_options_data(40, seed=9)
+    data['puts_near']['impliedVolatility'] = np.nan
+    cases['NAN_IV'] = data
+
+    data = synthetic_options_data(40, seed=10)
+    data['calls_near']['openInterest'] = 5.0
+    data['puts_target']['openInterest'] = np.nan
+    cases['ILLIQUID'] = data
+
+    data = synthetic_options_data(1, seed=11)
+    cases['ONE_CONTRACT'] = data
+    return cases
+
+def random_cases(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        f"T{i:04d}": synthetic_options_data(int(rng.integers(1, 400)), float(rng.uniform(5, 800)), seed=i * 7)
+        for i in range(count)
+    }
+
+def compact(options_data):
+    """Options data as served from the cache: float32 chains sorted by strike"""
+    return {**options_data, **{leg: compact_chain(options_data[leg]) for leg in LEGS}, 'strikes_sorted': True}
+
+@pytest.fixture(scope="module")
+def cases():
+    return {**edge_cases(), **random_cases(RANDOM_CASES)}
+
+@pytest.mark.parametrize("prepare", [lambda data: data, compact], ids=["raw", "compact"])
+def test_engine_matches_per_ticker_scorer(cases, prepare):
+    prepared = {ticker: prepare(options_data) for ticker, options_data in cases.items()}
+    results = score_many(prepared)
+    assert set(results) == set(prepared)
+    for ticker, options_data in prepared.items():
+        assert results[ticker] == calculate_unusualness_score(options_data), ticker
+
+def test_unstackable_tickers_are_left_out():
+    broken = synthetic_options_data(20, seed=12)
+    broken['calls_near'] = broken['calls_near'].drop(columns=['lastPrice'])
+    assert score_many({'BROKEN': broken, 'OK': synthetic_options_data(20, seed=13)}).keys() == {'OK'}
+
+def test_no_tickers():
+    assert score_many({}) == {}
@@ -0,0 +1,208 @@
+"""Unusual-option selection, filtering and ranking over column arrays.
+
+A contract is unusual when volume > 10, open interest > 10 and
+min(volume / open interest, 20) >= 2. UnusualOptions keeps the unusual
+contracts of one or more chains as columns: filters are boolean masks over
+those columns and a page of the ranking is picked with a partial top-K
+selection, so response dicts are only built for the contracts returned.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fast_json import RecordList
+from strike_index import StrikeIndex
+
+logger = logging.getLogger(__name__)
+
+OPTION_TYPES = ('call', 'put')
+CALL, PUT = 0, 1
+MONEYNESS = ('itm', 'otm', 'atm')
+OPTION_RECORD_FIELDS = (
+    'underlying_ticker', 'option_symbol', 'option_type', 'strike_price', 'expiration_date', 'days_to_expiry',
+    'current_volume', 'open_interest', 'implied_volatility', 'volume_ratio', 'in_the_money',
+    'current_stock_price', 'last_price'
+)
+# side indexes OPTION_TYPES and expiry indexes UnusualOptions.expirations,
+# so records share one string per value instead of one per contract
+COLUMN_DTYPES = {
+    'side': np.dtype('i1'),
+    'expiry': np.dtype(np.intp),
+    'strike': np.dtype(float),
+    'volume': np.dtype(float),
+    'open_interest': np.dtype(float),
+    'implied_volatility': np.dtype(float),
+    'volume_ratio': np.dtype(float),
+    'in_the_money': np.dtype(bool),
+    'last_price': np.dtype(float)
+}
+
+def unusual_option_columns(chain: pd.DataFrame, option_type: str, current_price: float,
+                           expiry: int) -> Dict[str, np.ndarray]:
+    """The unusual contracts of one chain as columns, selected with whole-column operations"""
+    volume = chain['volume'].to_numpy(dtype=float)
+    open_interest = chain['openInterest'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.minimum(volume / open_interest, 20)
+    # NaN volume/OI compares False, so missing data never qualifies
+    mask = (volume > 10) & (open_interest > 10) & (ratios >= 2)
+
+    strikes = chain['strike'].to_numpy(dtype=float)[mask]
+    count = len(strikes)
+    return {
+        'side': np.full(count, OPTION_TYPES.index(option_type), dtype=COLUMN_DTYPES['side']),
+        'expiry': np.full(count, expiry, dtype=COLUMN_DTYPES['expiry']),
+        'strike': strikes,
+        'volume': volume[mask],
+        'open_interest': open_interest[mask],
+        'implied_volatility': chain['impliedVolatility'].to_numpy(dtype=float)[mask],
+        # Rounded as reported, so ties in the ranking are the ties a reader sees
+        'volume_ratio': np.array([round(ratio, 2) for ratio in ratios[mask].tolist()], dtype=float),
+        'in_the_money': strikes < current_price if option_type == 'call' else strikes > current_price,
+        'last_price': chain['lastPrice'].to_numpy(dtype=float)[mask]
+    }
+
+def top_positions(keys: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k largest keys, largest first, equal keys in position order.
+
+    Gives the same order as a stable descending sort of every key, but only
+    the k selected keys are sorted.
+    """
+    n = len(keys)
+    if k >= n:
+        return np.argsort(-keys, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    threshold = np.partition(keys, n - k)[n - k]
+    above = np.flatnonzero(keys > threshold)
+    ties = np.flatnonzero(keys == threshold)[:k - len(above)]
+    chosen = np.sort(np.concatenate([above, ties]))
+    return chosen[np.argsort(-keys[chosen], kind='stable')]
+
+class UnusualOptions:
+    """Unusual contracts across (expiry, calls, puts) chains, in chain order"""
+
+    def __init__(self, ticker: str, current_price: Optional[float],
+                 chains: Iterable[Tuple[str, pd.DataFrame, pd.DataFrame]] = ()):
+        self.ticker = ticker
+        self.current_price = float(current_price) if current_price is not None else None
+        self.expirations: List[str] = []
+        self.days_to_expiry: List[int] = []
+        parts = []
+        today = datetime.now().date()
+        for expiry, calls, puts in chains:
+            try:
+                days_to_expiry = (datetime.strptime(expiry, '%Y-%m-%d').date() - today).days
+                position = len(self.expirations)
+                self.expirations.append(expiry)
+                self.days_to_expiry.append(days_to_expiry)
+                parts.append(unusual_option_columns(calls, 'call', current_price, position))
+                parts.append(unusual_option_columns(puts, 'put', current_price, position))
+            except Exception as e:
+                logger.error(f"Error processing {expiry} options for {ticker}: {str(e)}")
+        self.columns = {column: np.concatenate([part[column] for part in parts]) if parts else np.empty(0, dtype)
+                        for column, dtype in COLUMN_DTYPES.items()}
+        self._by_strike: Optional[Tuple[np.ndarray, StrikeIndex]] = None
+
+    def __len__(self) -> int:
+        return len(self.columns['strike'])
+
+    def by_strike(self) -> Tuple[np.ndarray, StrikeIndex]:
+        """Positions in strike order and an index over them, built on first use"""
+        if self._by_strike is None:
+            # argsort puts NaN strikes last, as StrikeIndex expects
+            order = np.argsort(self.columns['strike'], kind='stable')
+            self._by_strike = order, StrikeIndex(self.columns['strike'][order])
+        return self._by_strike
+
+    def select(self, option_type: Optional[str] = None, min_ratio: Optional[float] = None,
+               moneyness: Optional[str] = None, expiry: Optional[str] = None) -> np.ndarray:
+        """Positions of the contracts passing every given filter, in chain order"""
+        columns = self.columns
+        mask = np.ones(len(self), dtype=bool)
+        if option_type is not None:
+            mask &= columns['side'] == OPTION_TYPES.index(option_type)
+        if min_ratio is not None:
+            mask &= columns['volume_ratio'] >= min_ratio
+        if expiry is not None:
+            mask &= np.isin(columns['expiry'], [i for i, date in enumerate(self.expirations) if date == expiry])
+        if moneyness == 'itm':
+            mask &= columns['in_the_money']
+        elif moneyness == 'otm':
+            mask &= ~columns['in_the_money']
+        elif moneyness == 'atm':
+            # Same window as the ATM component of the unusualness score
+            order, index = self.by_strike()
+            atm = np.zeros(len(self), dtype=bool)
+            atm[order[index.atm(self.current_price if self.current_price is not None else np.nan)]] = True
+            mask &= atm
+        return np.flatnonzero(mask)
+
+    def ranked(self, positions: Optional[np.ndarray] = None, offset: int = 0,
+               limit: Optional[int] = None) -> np.ndarray:
+        """One page of positions, highest volume/OI ratio first"""
+        if positions is None:
+            positions = np.arange(len(self))
+        count = len(positions) if limit is None else min(offset + limit, len(positions))
+        return positions[top_positions(self.columns['volume_ratio'][positions], count)[offset:]]
+
+    def records(self, positions: np.ndarray) -> List[dict]:
+        """Response dicts for the given positions, in the order given"""
+        columns = {column: values[positions] for column, values in self.columns.items()}
+        symbol_strikes = (columns['strike'] * 100).astype(np.int64)
+        symbol_prefixes = (f"{self.ticker}C", f"{self.ticker}P")
+        return [
+            {
+                'underlying_ticker': self.ticker,
+                'option_symbol': f"{symbol_prefixes[side]}{symbol_strike}",
+                'option_type': OPTION_TYPES[side],
+                'strike_price': strike,
+                'expiration_date': self.expirations[expiry],
+                'days_to_expiry': self.days_to_expiry[expiry],
+                'current_volume': int(vol),
+                'open_interest': int(oi),
+                'implied_volatility': round(iv * 100, 2),
+                'volume_ratio': ratio,
+                'in_the_money': itm,
+                'current_stock_price': self.current_price,
+                'last_price': round(last_price, 2)
+            }
+            for side, expiry, strike, symbol_strike, vol, oi, iv, ratio, itm, last_price in zip(
+                columns['side'].tolist(),
+                columns['expiry'].tolist(),
+                columns['strike'].tolist(),
+                symbol_strikes.tolist(),
+                columns['volume'].tolist(),
+                columns['open_interest'].tolist(),
+                columns['implied_volatility'].tolist(),
+                columns['volume_ratio'].tolist(),
+                columns['in_the_money'].tolist(),
+                columns['last_price'].tolist()
+            )
+        ]
+
+    def summarize(self, offset: int = 0, limit: Optional[int] = None, **filters) -> dict:
+        """One ranked page of the filtered contracts plus call/put volume totals over all of them"""
+        positions = self.select(**filters)
+        # Reported volumes are truncated to ints, so the totals sum the truncated values
+        volume = np.trunc(self.columns['volume'][positions])
+        calls = self.columns['side'][positions] == CALL
+        calls_volume = int(volume[calls].sum())
+        puts_volume = int(volume[~calls].sum())
+        total_volume = calls_volume + puts_volume
+
+        return {
+            # Memoizes its JSON, so a cached summary is encoded once per layout
+            'options_activity': RecordList(self.records(self.ranked(positions, offset, limit)), OPTION_RECORD_FIELDS),
+            'total': len(positions),
+            'offset': offset,
+            'limit': limit,
+            'current_price': self.current_price,
+            'calls_volume': calls_volume,
+            'puts_volume': puts_volume,
+            'calls_percentage': (calls_volume / total_volume * 100) if total_volume > 0 else 0,
+            'puts_percentage': (puts_volume / total_volume * 100) if total_volume > 0 else 0
+        }